@@ -1,8 +1,9 @@
 # arp.py
 from enum import Enum
-import mido
 import random
+import weakref
 from typing import Tuple
+from event_buffer import EventBuffer, PROGRAM_CHANGE, CONTROL_CHANGE, NOTE_ON, NOTE_OFF
 
 
 class Mode(Enum):
@@ -22,6 +23,11 @@ class Arpeggiator():
     - Have variants:
         - Variants are notes defined by offsets in relation to the ground note
     """
+    __slots__ = (
+        "rate", "note_length", "ground_note", "mute_ground_note", "mode", "velocity",
+        "variants_active", "chords_active", "variants", "mute", "vibrato", "reverb", "chorus",
+    )
+
     def __init__(self, bpm_multiplier: float, note_length: float, ground_note: int, mute_ground_note: bool, mode: Mode, mute: bool, vibrato: bool, reverb: bool, chorus: bool, volume: int, variants_active, chords_active, variants):
         # rate: If rate 1, the arpeggio plays at the same speed as the song
         self.rate = bpm_multiplier
@@ -48,16 +54,51 @@ class Arpeggiator():
         # about chorus
         self.chorus = chorus
 
-    def get_arpeggio(self, bpm, instrument) -> Tuple[list[mido.Message], int]:
+    def params(self) -> "ArpParams":
+        """Immutable snapshot of all parameters (e.g. for the playback thread or as a cache key)."""
+        return ArpParams(
+            rate=self.rate,
+            note_length=self.note_length,
+            ground_note=self.ground_note,
+            mute_ground_note=self.mute_ground_note,
+            mode=self.mode,
+            velocity=self.velocity,
+            variants_active=tuple(self.variants_active),
+            chords_active=tuple(self.chords_active),
+            variants=tuple(self.variants),
+            mute=self.mute,
+            vibrato=self.vibrato,
+            reverb=self.reverb,
+            chorus=self.chorus,
+        )
+
+    @classmethod
+    def from_params(cls, params: "ArpParams") -> "Arpeggiator":
+        return cls(
+            bpm_multiplier=params.rate,
+            note_length=params.note_length,
+            ground_note=params.ground_note,
+            mute_ground_note=params.mute_ground_note,
+            mode=params.mode,
+            mute=params.mute,
+            vibrato=params.vibrato,
+            reverb=params.reverb,
+            chorus=params.chorus,
+            volume=params.velocity,
+            variants_active=list(params.variants_active),
+            chords_active=list(params.chords_active),
+            variants=list(params.variants),
+        )
+
+    def get_arpeggio(self, bpm, instrument) -> Tuple[EventBuffer, int]:
         value = 127 if self.vibrato else 0
         valueR = 127 if self.reverb else 0
         valueC = 127 if self.chorus else 0
-        track = [
-            mido.Message('program_change', program=instrument, time=0),  # Set instrument
-        ]
-        track.append(mido.Message('control_change', control=1, value=value))  # Set vibrato
-        track.append(mido.Message('control_change', control=91, value=valueR)) # Set reverb
-        track.append(mido.Message('control_change', control=93, value=valueC))  # Set chorus
+        track = EventBuffer()
+        track.append(0, PROGRAM_CHANGE, instrument)  # Set instrument
+        track.append(0, CONTROL_CHANGE, 1, value)  # Set vibrato
+        track.append(0, CONTROL_CHANGE, 91, valueR)  # Set reverb
+        track.append(0, CONTROL_CHANGE, 93, valueC)  # Set chorus
 
         major_scale = [0, 2, 4, 5, 7, 9, 11, 12]       # C D E F G A B C
         minor_scale = [0, 2, 3, 5, 7, 8, 10, 12]       # C D Eb F G Ab Bb C
@@ -79,10 +120,10 @@ class Arpeggiator():
 
         if not notes:
             t = (60 / bpm) * (1 / self.rate)  # 1 full note length
-            return [
-                mido.Message('note_off', note=0, velocity=self.velocity, time=0), 
-                mido.Message('note_off', note=0, velocity=self.velocity, time=t)
-            ], t
+            track = EventBuffer()
+            track.append(0, NOTE_OFF, 0, self.velocity)
+            track.append(t, NOTE_OFF, 0, self.velocity)
+            return track, t
 
         """
         # Chord modes override variants if active
@@ -119,29 +160,121 @@ class Arpeggiator():
         # 4) Build note-on / note-off pairs with correct delta times
         # We want each note_on -> note_off after note_duration,
         # and then we wait (time_step - note_duration) before the next note_on
+        first_type = NOTE_OFF if self.mute else NOTE_ON
         for i, note in enumerate(notes):
-            if not self.mute:
-                track.append(mido.Message('note_on', note=note, velocity=self.velocity, time=0))
-            else:
-                track.append(mido.Message('note_off', note=note, velocity=self.velocity, time=0))
-            track.append(mido.Message('note_off', note=note, velocity=self.velocity, time=note_duration))
+            track.append(0, first_type, note, self.velocity)
+            track.append(note_duration, NOTE_OFF, note, self.velocity)
             # Wait until the next note is played to enable shorter note lengths
-            track.append(mido.Message('note_off', note=note, velocity=self.velocity, time=max_note_duration - note_duration))
+            track.append(max_note_duration - note_duration, NOTE_OFF, note, self.velocity)
 
             # Calculate the total time for the arpeggio
             total_time += time_step
         return track, total_time
 
 
+class ArpParams:
+    """
+    Immutable, hashable snapshot of an Arpeggiator (see Arpeggiator.params).
+    Same attribute names as Arpeggiator, so it compiles exactly like the Arpeggiator it was taken from.
+
+    Instances are interned (flyweights): creating an ArpParams equal to one that is still alive
+    returns that instance. Identical blocks (e.g. duplicates) therefore share one object, and one
+    compiled arpeggio in the ArpeggioCache, whose key comparisons become identity checks.
+    The hash is computed once. Iterating yields the fields in order, like a tuple.
+    """
+    _fields = (
+        "rate", "note_length", "ground_note", "mute_ground_note", "mode", "velocity",
+        "variants_active", "chords_active", "variants", "mute", "vibrato", "reverb", "chorus",
+    )
+    __slots__ = _fields + ("_values", "_hash", "__weakref__")
+
+    _interned = weakref.WeakValueDictionary()  # field values -> live instance
+
+    def __new__(cls, rate, note_length, ground_note, mute_ground_note, mode, velocity,
+                variants_active, chords_active, variants, mute, vibrato, reverb, chorus):
+        # Normalized first: 1 == 1.0 == True, so the key alone would mix up the types of the fields
+        values = (
+            float(rate), float(note_length), int(ground_note), bool(mute_ground_note), mode, int(velocity),
+            tuple(map(bool, variants_active)), tuple(map(bool, chords_active)), tuple(map(int, variants)),
+            bool(mute), bool(vibrato), bool(reverb), bool(chorus),
+        )
+        return cls._intern(values)
+
+    @classmethod
+    def _intern(cls, values):
+        """The instance for `values`, a tuple of fields already normalized like __new__ does."""
+        instance = cls._interned.get(values)
+        if instance is not None:
+            return instance
+
+        instance = object.__new__(cls)
+        set_attribute = object.__setattr__
+        for name, value in zip(cls._fields, values):
+            set_attribute(instance, name, value)
+        set_attribute(instance, "_values", values)
+        set_attribute(instance, "_hash", hash(values))
+        cls._interned[values] = instance
+        return instance
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ArpParams is immutable, use _replace({name}=...)")
+
+    def __delattr__(self, name):
+        raise AttributeError("ArpParams is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, ArpParams):
+            return NotImplemented
+        return self._hash == other._hash and self._values == other._values
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self._fields, self._values))
+        return f"ArpParams({fields})"
+
+    def __reduce__(self):
+        return (ArpParams, self._values)  # Unpickling interns again
+
+    def _replace(self, **changes):
+        """Copy with some fields changed (like NamedTuple._replace)."""
+        values = dict(zip(self._fields, self._values))
+        values.update(changes)
+        return ArpParams(**values)
+
+    @classmethod
+    def interned_count(cls):
+        """Number of distinct live instances."""
+        return len(cls._interned)
+
+    get_arpeggio = Arpeggiator.get_arpeggio
+
+
 if __name__ == "__main__":
     arp = Arpeggiator(
         bpm_multiplier=1,
         note_length=0.5,
         ground_note=60,
+        mute_ground_note=False,
         mode=Mode.UP,
+        mute=False,
+        vibrato=False,
+        reverb=False,
+        chorus=False,
+        volume=64,
         variants_active=[False, False, False],
         chords_active=[False, False, False],
         variants=[7, 5, 0]
     )
-    for msg in arp.get_arpeggio(120, 0):
+    track, total_time = arp.get_arpeggio(120, 0)
+    for msg in track.to_mido():
         print(msg)
@@ -0,0 +1,104 @@
+# arp_cache.py
+import threading
+from collections import OrderedDict
+from arp import Mode
+
+
+class ArpeggioCache:
+    """
+    Cache of compiled arpeggios (the result of Arpeggiator.get_arpeggio).
+
+    - Entries are keyed by (ArpParams, bpm, instrument), so an unchanged block costs a dict
+      lookup per loop instead of a recompile.
+    - Each owner (usually an ArpeggiatorBlockWidget) remembers its last key. When the owner
+      compiles with another key (any edit, BPM or instrument change), its previous entry is
+      dropped unless another owner still uses it.
+    - Entries without an owner (project files) are only bounded by max_entries: the least
+      recently used entries go first.
+    - Random mode arpeggios are reshuffled every loop and are never cached.
+    """
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._compiled = OrderedDict()  # key -> (track, duration), least recently used first
+        self._owner_keys = {}  # owner -> key of the last compiled entry
+        self._key_owners = {}  # key -> number of owners whose last key it is
+        self._lock = threading.Lock()  # Used from the GUI, compile and playback threads
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0  # Random mode, compiled without caching
+
+    def get_arpeggio(self, owner, params, bpm, instrument):
+        """
+        Return (track, duration) for `params` (an ArpParams), compiling only on a cache miss.
+        `owner` identifies the block for invalidate(). None if the entry has no owner.
+        """
+        if params.mode == Mode.RANDOM:
+            with self._lock:
+                self.bypassed += 1
+            return params.get_arpeggio(bpm, instrument)
+
+        key = (params, bpm, instrument)
+        with self._lock:
+            entry = self._compiled.get(key)
+            if entry is not None:
+                self._compiled.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            entry = params.get_arpeggio(bpm, instrument)  # Outside the lock, may take a while
+
+        with self._lock:
+            self._compiled[key] = entry
+            if owner is not None:
+                self._set_owner_key(owner, key)
+            while len(self._compiled) > self.max_entries:
+                self._compiled.popitem(last=False)
+        return entry
+
+    def _set_owner_key(self, owner, key):
+        previous = self._owner_keys.get(owner)
+        if previous == key:
+            return
+        self._owner_keys[owner] = key
+        self._key_owners[key] = self._key_owners.get(key, 0) + 1
+        if previous is not None:
+            self._release_key(previous)
+
+    def _release_key(self, key):
+        """One owner less for `key`: drop the entry when nobody uses it anymore."""
+        owners = self._key_owners.pop(key, 0) - 1
+        if owners > 0:
+            self._key_owners[key] = owners
+        else:
+            self._compiled.pop(key, None)
+
+    def invalidate(self, owner):
+        """
+        Forget `owner` (e.g. a removed block): its entry is dropped unless another owner uses it,
+        and its key is no longer counted once no owner references it.
+        """
+        with self._lock:
+            key = self._owner_keys.pop(owner, None)
+            if key is not None:
+                self._release_key(key)
+
+    def clear(self):
+        with self._lock:
+            self._compiled.clear()
+            self._owner_keys.clear()
+            self._key_owners.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._compiled),
+                "owners": len(self._owner_keys),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+            }
+
+
+# Shared by all instrument rows
+arpeggio_cache = ArpeggioCache()
@@ -1,6 +1,6 @@
 # arp_widget.py
 import sys
-import mido
+import itertools
 from PySide6.QtCore import QSize, Qt
 from PySide6.QtWidgets import (
     QApplication,
@@ -18,9 +18,10 @@ from PySide6.QtWidgets import (
     QFrame,
     QGraphicsDropShadowEffect
 )
-from PySide6.QtCore import Qt, Signal, QTimer, Slot
-from PySide6.QtGui import QColor
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QColor, QPainter
 from arp import Arpeggiator, Mode
+from arp_cache import arpeggio_cache
 from custom_widgets import NoScrollSlider, NoScrollDoubleSpinBox, MuteSpinBox, GroundNoteSpinBox
 
 
@@ -28,13 +29,18 @@ class ArpeggiatorBlockWidget(QWidget):
     """
     A small widget containing:
       - SpinBox for loop count
-      - One ArpeggiatorWidget
+      - A BlockSummary while collapsed, or an ArpeggiatorWidget editor while expanded
       - Surrounded by a tight QFrame
+    The block owns its Arpeggiator (self.arp). Editors are only built when a block is expanded,
+    and go back to editor_pool when it is collapsed.
     """
     play_time_changed = Signal()
+    params_changed = Signal()
+    rate_changed = Signal(object, float, float)  # (block, old rate, new rate)
     mute_change = Signal()
 
     minimal_block_width = 500  # Minimum width (in pixel) for the arpeggiator block
+    _uids = itertools.count()  # Stable block ids for project snapshots and the arpeggio cache
 
     def __init__(
         self,
@@ -63,6 +69,7 @@ class ArpeggiatorBlockWidget(QWidget):
             variants = [0, 0, 0]
 
         self.id = id
+        self.uid = next(ArpeggiatorBlockWidget._uids)
         self.velocity = velocity
         self._parent = parent
 
@@ -132,47 +139,108 @@ class ArpeggiatorBlockWidget(QWidget):
         top_row_layout.addWidget(self.move_right_button)
         top_row_layout.addWidget(self.delete_button)
     
-        self.arp_widget = ArpeggiatorWidget(
-            parent=self,
-            velocity=velocity,
-            rate=rate,
-            note_length=note_length,
-            ground_note=ground_note,
-            mute_ground_note=mute_ground_note,
-            mode=mode,
-            mute=mute,
-            vibrato=vibrato,
-            reverb=reverb,
-            chorus=chorus,
-            variants_active=variants_active,
-            chords_active=chords_active,
-            variants=variants,
-            volume_line_signal=volume_line_signal
+        self.arp = Arpeggiator(
+            rate,
+            note_length,
+            ground_note,
+            mute_ground_note,
+            mode,
+            mute,
+            vibrato,
+            reverb,
+            chorus,
+            velocity,
+            variants_active,
+            chords_active,
+            variants
         )
+        self.arp_widget = None  # Editor, only while expanded (see expand)
 
-        # self.arp_widget.setFixedSize(QSize(300, 220))
-        self.arp_widget.setSizePolicy(QSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum))
+        # Expand / collapse button
+        self.btn_expand = QPushButton("▸")
+        self.btn_expand.setToolTip("Show or hide the editor of this block")
+        self.btn_expand.setFixedSize(24, 24)
+        self.btn_expand.clicked.connect(self.toggle_expanded)
+        top_row_layout.insertWidget(0, self.btn_expand)
+
+        self.summary = BlockSummary(self)
+        self.summary.activated.connect(self.expand)
 
         # Add subwidgets to frame layout
+        self.frame_layout = frame_layout
         frame_layout.addLayout(top_row_layout)
-        frame_layout.addWidget(self.arp_widget)
+        frame_layout.addWidget(self.summary)
 
         # Finally, put the frame in the outer layout
         outer_layout.addWidget(self.frame)
 
+        if volume_line_signal:
+            volume_line_signal.connect(self.change_arp_volume)
+
         # Connect signals
-        self.arp_widget.play_time_changed.connect(self._on_arp_widget_changed)
+        self._rate = self.rate  # Last rate reported through rate_changed
+        self._width = None  # Last width set by update_size
+
+        self.params_changed.connect(self.summary.update)
+        self.play_time_changed.connect(self.invalidate_cache)
+
+    def expand(self):
+        """Show the full editor, taken from editor_pool."""
+        if self.arp_widget is not None:
+            return
+        editor = editor_pool.acquire()
+        editor.bind(self.arp)
+        editor.play_time_changed.connect(self._on_arp_widget_changed)
+        editor.params_changed.connect(self.params_changed.emit)
+        if self._width is not None:
+            editor.setFixedWidth(self._width)
+        self.arp_widget = editor
+        self.summary.hide()
+        self.frame_layout.addWidget(editor)
+        editor.show()
+        self.btn_expand.setText("▾")
+
+    def collapse(self):
+        """Back to the summary. The editor is returned to editor_pool."""
+        editor = self.arp_widget
+        if editor is None:
+            return
+        editor.play_time_changed.disconnect(self._on_arp_widget_changed)
+        editor.params_changed.disconnect(self.params_changed.emit)
+        self.frame_layout.removeWidget(editor)
+        self.arp_widget = None
+        editor_pool.release(editor)
+        self.summary.show()
+        self.btn_expand.setText("▸")
+
+    def toggle_expanded(self):
+        if self.arp_widget is None:
+            self.expand()
+        else:
+            self.collapse()
+
+    def change_arp_volume(self):
+        self.arp.velocity = self.velocity
+        self.params_changed.emit()
+
+    def invalidate_cache(self):
+        """Drop this block's compiled arpeggio from the cache."""
+        arpeggio_cache.invalidate(self.uid)
 
     def _on_arp_widget_changed(self):
         """Give signal from arp widget through to parent"""
+        rate = self.rate
+        if rate != self._rate:
+            old_rate, self._rate = self._rate, rate
+            self.rate_changed.emit(self, old_rate, rate)
         self.play_time_changed.emit()
 
     @property
     def rate(self):
-        return self.arp_widget.rate
+        return self.arp.rate
     
     def get_config(self):
-        arp = self.arp_widget.arp
+        arp = self.arp
         return {
             "velocity": arp.velocity,
             "rate": arp.rate,
@@ -194,20 +262,22 @@ class ArpeggiatorBlockWidget(QWidget):
             config = self.get_config()
             self._parent.duplicate_arp_block(self, config)
     
+    def update_width(self, max_rate):
+        """Width relative to the fastest block of the project (which gets minimal_block_width)."""
+        self.update_size(self.minimal_block_width * (max_rate / self._rate))
+
     def update_size(self, arp_width):
+        if arp_width == self._width:
+            return  # setFixedWidth would still trigger a relayout
+        self._width = arp_width
         self.setFixedWidth(arp_width)
-        self.arp_widget.setFixedWidth(arp_width)
+        if self.arp_widget is not None:
+            self.arp_widget.setFixedWidth(arp_width)
 
-    def get_arpeggio(self, bpm, instrument) -> tuple[list[mido.Message], int]:
-        notes, duration = self.arp_widget.arp.get_arpeggio(bpm, instrument)
-        block_id = f"{self._parent.row_container.id}#{self.id}"
-        marker = mido.MetaMessage("marker", text=block_id, time=0)
-        return [marker] + notes, duration
-    
     def get_play_time(self, bpm) -> float:
         """Get the play time for this arpeggiator block"""
         # e.g.: If rate=2 => half the time
-        total_time = (1 / self.arp_widget.arp.rate) * (60 / bpm)
+        total_time = (1 / self.arp.rate) * (60 / bpm)
         return total_time
 
     def move_left(self):
@@ -222,24 +292,80 @@ class ArpeggiatorBlockWidget(QWidget):
         if self._parent:
             self._parent.remove_block(self)
 
-    @Slot()
-    def flash(self):
-        try:
+    def set_highlighted(self, highlighted):
+        """Show or hide the playhead glow around this block."""
+        if highlighted:
             effect = QGraphicsDropShadowEffect(self)
             effect.setBlurRadius(20)
             effect.setOffset(0)
             effect.setColor(QColor("#E50046"))
             self.frame.setGraphicsEffect(effect)
-            QTimer.singleShot(100, self.clear_flash)
-        except Exception as e:
-            print(f"Failed during flash: {e}")
+        else:
+            self.frame.setGraphicsEffect(None)
 
-    def clear_flash(self):
-        self.frame.setGraphicsEffect(None)
+
+class BlockSummary(QWidget):
+    """
+    Collapsed view of a block: ground note, mode, rate and mute, painted in one go.
+    Click it, press Enter/Space or tab to it to open the editor.
+    """
+    activated = Signal()
+
+    mode_names = {None: "No mode", Mode.UP: "Up", Mode.DOWN: "Down", Mode.RANDOM: "Random"}
+
+    def __init__(self, block):
+        super().__init__(block)
+        self.block = block
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setCursor(Qt.PointingHandCursor)
+        self.setMinimumHeight(60)
+        self.setSizePolicy(QSizePolicy(QSizePolicy.Minimum, QSizePolicy.Expanding))
+
+    def paintEvent(self, event):
+        arp = self.block.arp
+        painter = QPainter(self)
+        rect = self.rect().adjusted(1, 1, -1, -1)
+        painter.fillRect(rect, QColor("#555555") if arp.mute else QColor("#3A4A5C"))
+        if self.hasFocus():
+            painter.setPen(QColor("#FFFFFF"))
+            painter.drawRect(rect)
+
+        painter.setPen(QColor("#F0F0F0"))
+        ground_note = "muted" if arp.mute_ground_note else ArpeggiatorWidget.midi_to_note_name(arp.ground_note)
+        variants = sum(arp.variants_active)
+        lines = [
+            f"{ground_note}  +{variants} variant{'s' if variants != 1 else ''}",
+            f"{self.mode_names[arp.mode]}  x{arp.rate:g}" + ("  (muted)" if arp.mute else ""),
+        ]
+        painter.drawText(rect.adjusted(8, 0, -8, 0), Qt.AlignVCenter | Qt.AlignLeft, "\n".join(lines))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        self.activated.emit()
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Space):
+            self.activated.emit()
+        else:
+            super().keyPressEvent(event)
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        reason = event.reason()
+        if reason not in (Qt.TabFocusReason, Qt.BacktabFocusReason, Qt.ShortcutFocusReason):
+            return  # E.g. the window was activated: nothing was asked of this block
+        self.activated.emit()
+        editor = self.block.arp_widget
+        if editor is not None:
+            # The summary is hidden now: keyboard focus continues inside the editor
+            fields = [w for w in editor.findChildren(QWidget) if w.focusPolicy() & Qt.TabFocus and w.isVisibleTo(editor)]
+            if fields:
+                (fields[-1] if reason == Qt.BacktabFocusReason else fields[0]).setFocus(reason)
 
 
 class ArpeggiatorWidget(QWidget):
     play_time_changed = Signal()
+    params_changed = Signal()  # Any parameter of self.arp changed
 
     def __init__(
         self,
@@ -551,6 +677,41 @@ class ArpeggiatorWidget(QWidget):
     def rate(self):
         return self.arp.rate
 
+    def bind(self, arp):
+        """
+        Show and edit `arp` (an Arpeggiator) instead of the current one, so an editor can be
+        reused for another block (see EditorPool). Emits nothing.
+        """
+        self.arp = arp
+        self.blockSignals(True)
+        controls = [
+            self.mute_checkbox, self.vibrato_checkbox, self.reverb_checkbox, self.chorus_checkbox,
+            self.rate_slider, self.rate_spin, self.note_length_slider, self.note_length_spin,
+            self.ground_note_slider, self.ground_note_spin, self.mute_ground_checkbox,
+        ]
+        for control in controls:
+            control.blockSignals(True)
+
+        self.mute_checkbox.setChecked(arp.mute)
+        self.vibrato_checkbox.setChecked(arp.vibrato)
+        self.reverb_checkbox.setChecked(arp.reverb)
+        self.chorus_checkbox.setChecked(arp.chorus)
+        self.rate_slider.setValue(self.rate_values.index(self.closest_in_list(arp.rate, self.rate_values)))
+        self.rate_spin.setValue(arp.rate)
+        self.note_length_slider.setValue(round(arp.note_length * 10))
+        self.note_length_spin.setValue(arp.note_length)
+        self.ground_note_slider.setValue(arp.ground_note)
+        self.ground_note_spin.setValue(arp.ground_note)
+        self.update_ground_note_label(arp.ground_note)
+        self.mute_ground_checkbox.setChecked(arp.mute_ground_note)
+        for button in self.mode_button_group.buttons():
+            button.setChecked(self.get_mode_from_button(button) == arp.mode)
+
+        for control in controls:
+            control.blockSignals(False)
+        self.set_variants(arp.variants_active, arp.variants)  # Also updates the chord buttons
+        self.blockSignals(False)
+
     # ---------------------------------------------------------------------------------------
     # Helper to change button color for Variant toggles
     # ---------------------------------------------------------------------------------------
@@ -570,6 +731,7 @@ class ArpeggiatorWidget(QWidget):
         self.rate_spin.blockSignals(False)
         self.arp.rate = chosen_rate
         self.play_time_changed.emit()  # Emit signal to update play time
+        self.params_changed.emit()
 
     def on_rate_spin_changed(self, spin_value: float):
         chosen_rate = self.closest_in_list(spin_value, self.rate_values)
@@ -582,6 +744,7 @@ class ArpeggiatorWidget(QWidget):
         self.rate_slider.blockSignals(False)
         self.arp.rate = chosen_rate
         self.play_time_changed.emit()  # Emit signal to update play time
+        self.params_changed.emit()
 
     def closest_in_list(self, value, valid_list):
         return min(valid_list, key=lambda x: abs(x - value))
@@ -592,9 +755,11 @@ class ArpeggiatorWidget(QWidget):
     def on_mute_changed(self, state: int):
         checked = state == 2  # Qt.Checked
         self.arp.mute = checked
+        self.params_changed.emit()
         
     def change_arp_volume(self):
         self.arp.velocity = self._parent.velocity
+        self.params_changed.emit()
 
     # ---------------------------------------------------------------------------------------
     # Vibrato changed
@@ -602,6 +767,7 @@ class ArpeggiatorWidget(QWidget):
     def on_vibrato_changed(self, state: int):
         checked = state == 2
         self.arp.vibrato = checked
+        self.params_changed.emit()
 
     # ---------------------------------------------------------------------------------------
     # Chorus changed
@@ -609,6 +775,7 @@ class ArpeggiatorWidget(QWidget):
     def on_chorus_changed(self, state: int):
         checked = state == 2
         self.arp.chorus = checked
+        self.params_changed.emit()
         
     # ---------------------------------------------------------------------------------------
     # Reverb changed
@@ -616,6 +783,7 @@ class ArpeggiatorWidget(QWidget):
     def on_reverb_changed(self, state: int):
         checked = state == 2
         self.arp.reverb = checked
+        self.params_changed.emit()
 
     # ---------------------------------------------------------------------------------------
     # NOTE LENGTH
@@ -626,6 +794,7 @@ class ArpeggiatorWidget(QWidget):
         self.note_length_spin.setValue(length)
         self.note_length_spin.blockSignals(False)
         self.arp.note_length = length
+        self.params_changed.emit()
 
     def on_note_length_spin_changed(self, spin_value: float):
         snapped = round(spin_value, 1)
@@ -640,6 +809,7 @@ class ArpeggiatorWidget(QWidget):
         self.note_length_slider.setValue(slider_val)
         self.note_length_slider.blockSignals(False)
         self.arp.note_length = snapped
+        self.params_changed.emit()
 
     # ---------------------------------------------------------------------------------------
     # GROUND NOTE
@@ -664,7 +834,8 @@ class ArpeggiatorWidget(QWidget):
         note_name = self.midi_to_note_name(midi_note)
         self.ground_note_label.setText(f"Ground note {note_name}:")
 
-    def midi_to_note_name(self, midi_note: int) -> str:
+    @staticmethod
+    def midi_to_note_name(midi_note: int) -> str:
         notes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
         octave = midi_note // 12 - 1
         note = notes[midi_note % 12]
@@ -673,6 +844,7 @@ class ArpeggiatorWidget(QWidget):
     def on_mute_ground_note_changed(self, state: int):
         checked = state == 2  # Qt.Checked
         self.arp.mute_ground_note = checked
+        self.params_changed.emit()
     
     # ---------------------------------------------------------------------------------------
     # MODE
@@ -691,6 +863,7 @@ class ArpeggiatorWidget(QWidget):
             self.arp.mode = clicked_mode
             for btn in self.mode_button_group.buttons():
                 btn.setChecked(btn == sender)
+        self.params_changed.emit()
 
     def get_mode_from_button(self, button):
         if button == self.btn_up:
@@ -822,6 +995,7 @@ class ArpeggiatorWidget(QWidget):
         self.btn_major.blockSignals(False)
         self.btn_minor.blockSignals(False)
         self.btn_penta.blockSignals(False)
+        self.params_changed.emit()
 
     # ---------------------------------------------------------------------------------------
     # VARIANT 1, 2, 3 OFFSETS
@@ -923,6 +1097,35 @@ class ArpeggiatorWidget(QWidget):
         self.update_chord_button_states()
 
 
+class EditorPool:
+    """
+    Recycles ArpeggiatorWidgets between blocks. Building the editor is most of the cost of a
+    block, so blocks start collapsed and only borrow an editor while expanded.
+    """
+    def __init__(self, size=4):
+        self.size = size  # Idle editors kept for reuse, the others are deleted
+        self._free = []
+
+    def acquire(self) -> ArpeggiatorWidget:
+        if self._free:
+            return self._free.pop()
+        editor = ArpeggiatorWidget()
+        editor.setSizePolicy(QSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum))
+        return editor
+
+    def release(self, editor):
+        editor.hide()
+        editor.setParent(None)
+        if len(self._free) < self.size:
+            self._free.append(editor)
+        else:
+            editor.deleteLater()
+
+
+# Shared by all blocks (editors are created on first use, after the QApplication)
+editor_pool = EditorPool()
+
+
 def main():
     app = QApplication(sys.argv)
     window = ArpeggiatorWidget()
@@ -0,0 +1,169 @@
+# batch_compile.py
+"""
+Vectorized compilation of many arpeggio blocks at once with NumPy.
+
+compile_project_batch() produces the same tracks as project.compile_project(), but instead of
+calling Arpeggiator.get_arpeggio block by block, the parameters of all blocks of the project are
+turned into arrays and every event is computed in one pass:
+
+  - every block gets a fixed layout of SLOTS event slots:
+        MARKER, PROGRAM_CHANGE, CC 1, CC 91, CC 93, then (NOTE_ON, NOTE_OFF, NOTE_OFF) per note
+  - a mask keeps the slots that exist (number of notes, markers, changed program/controllers)
+  - flattening the masked [blocks, SLOTS] arrays gives all events of the project in order,
+    which are split into one EventBuffer per row
+
+Random mode blocks are shuffled with NumPy's generator, so they differ from get_arpeggio's
+random.shuffle (but are just as random). Everything else is identical, event for event.
+"""
+from array import array
+import numpy as np
+
+from event_buffer import EventBuffer, PROGRAM_CHANGE, CONTROL_CHANGE, NOTE_ON, NOTE_OFF, MARKER
+from project import row_play_time
+
+MAX_NOTES = 4  # Ground note + 3 variants
+STATE_SLOTS = 5  # MARKER, PROGRAM_CHANGE, CC 1, CC 91, CC 93
+SLOTS = STATE_SLOTS + 3 * MAX_NOTES
+SILENCE = -25  # Variant offset meaning "silence"
+
+_INT = np.dtype(f"i{array('i').itemsize}")  # Same width as EventBuffer.data1/data2
+
+_rng = np.random.default_rng()
+
+
+def _columns(blocks):
+    """Parameters of all blocks (ArpParams) as NumPy arrays."""
+    (rate, note_length, ground_note, mute_ground_note, mode, velocity,
+     variants_active, _chords_active, variants, mute, vibrato, reverb, chorus) = zip(*[block._values for block in blocks])
+    return {
+        "rate": np.array(rate, dtype=np.float64),
+        "note_length": np.array(note_length, dtype=np.float64),
+        "ground_note": np.array(ground_note, dtype=np.int64),
+        "mute_ground_note": np.array(mute_ground_note, dtype=bool),
+        "mode": np.array([0 if m is None else m.value + 1 for m in mode], dtype=np.int8),  # 0 = no mode, 1 = UP, 2 = DOWN, 3 = RANDOM
+        "velocity": np.array(velocity, dtype=np.int64),
+        "variants_active": np.array(variants_active, dtype=bool).reshape(-1, 3),
+        "variants": np.array(variants, dtype=np.int64).reshape(-1, 3),
+        "mute": np.array(mute, dtype=bool),
+        "vibrato": np.array(vibrato, dtype=bool),
+        "reverb": np.array(reverb, dtype=bool),
+        "chorus": np.array(chorus, dtype=bool),
+    }
+
+
+def _notes(c):
+    """Notes of every block in play order, as ([blocks, MAX_NOTES] notes, note count per block)."""
+    count = len(c["rate"])
+    notes = np.zeros((count, MAX_NOTES), dtype=np.int64)
+    valid = np.zeros((count, MAX_NOTES), dtype=bool)
+
+    notes[:, 0] = np.where(c["mute_ground_note"], 0, c["ground_note"])  # 0 = silence
+    valid[:, 0] = True
+    variant_notes = np.where(c["variants"] == SILENCE, 0, c["ground_note"][:, None] + c["variants"])
+    notes[:, 1:] = variant_notes
+    valid[:, 1:] = c["variants_active"]
+    n = valid.sum(axis=1)
+
+    # Sort keys: invalid slots always go last
+    mode = c["mode"][:, None]
+    big = np.iinfo(np.int64).max
+    key = np.where(mode == 1, notes, 0)  # UP
+    key = np.where(mode == 2, -notes, key)  # DOWN
+    key = np.where(mode == 0, np.arange(MAX_NOTES), key)  # No mode: input order
+    random_keys = _rng.random((count, MAX_NOTES))
+    key = np.where(mode == 3, (random_keys * 1e6).astype(np.int64), key)  # RANDOM
+    key = np.where(valid, key, big)
+    order = np.argsort(key, axis=1, kind="stable")
+    return np.take_along_axis(notes, order, axis=1), n
+
+
+def compile_blocks(blocks, rows, instruments, bpm, markers=False, block_index=None):
+    """
+    Compile blocks of several rows at once.
+      - blocks:      sequence of ArpParams (the blocks of each row are consecutive)
+      - rows:        row (= channel) of every block
+      - instruments: instrument (program) of every block's row
+      - block_index: index of every block within its row (for MARKER events)
+    Returns the column arrays (time, channel, type, data1, data2) of all events, in order.
+    Times are delta times within each row.
+    """
+    c = _columns(blocks)
+    rows = np.asarray(rows, dtype=np.int64)
+    count = len(rows)
+    notes, n = _notes(c)
+
+    # Same formulas (and operation order) as Arpeggiator.get_arpeggio
+    note_duration = (60 / bpm) * (c["note_length"] / c["rate"]) / n
+    max_note_duration = (60 / bpm) * (1 / c["rate"]) / n
+
+    time = np.zeros((count, SLOTS), dtype=np.float64)
+    type = np.zeros((count, SLOTS), dtype=np.uint8)
+    data1 = np.zeros((count, SLOTS), dtype=_INT)
+    data2 = np.zeros((count, SLOTS), dtype=_INT)
+    keep = np.zeros((count, SLOTS), dtype=bool)
+
+    # State slots, left out when they repeat the previous block of the same row (like compile_row)
+    first_in_row = np.ones(count, dtype=bool)
+    first_in_row[1:] = rows[1:] != rows[:-1]
+    type[:, 0], data1[:, 0], data2[:, 0] = MARKER, rows, (block_index if block_index is not None else 0)
+    keep[:, 0] = markers
+    type[:, 1], data1[:, 1] = PROGRAM_CHANGE, instruments
+    for slot, control, values in ((2, 1, c["vibrato"]), (3, 91, c["reverb"]), (4, 93, c["chorus"])):
+        type[:, slot], data1[:, slot], data2[:, slot] = CONTROL_CHANGE, control, np.where(values, 127, 0)
+    for slot in range(1, STATE_SLOTS):
+        changed = np.ones(count, dtype=bool)
+        changed[1:] = (data1[1:, slot] != data1[:-1, slot]) | (data2[1:, slot] != data2[:-1, slot])
+        keep[:, slot] = changed | first_in_row
+
+    # Note slots: NOTE_ON (NOTE_OFF if the block is muted), then two NOTE_OFFs
+    first_type = np.where(c["mute"], NOTE_OFF, NOTE_ON)
+    for j in range(MAX_NOTES):
+        on, off, rest = STATE_SLOTS + 3 * j, STATE_SLOTS + 3 * j + 1, STATE_SLOTS + 3 * j + 2
+        type[:, on], type[:, off], type[:, rest] = first_type, NOTE_OFF, NOTE_OFF
+        data1[:, on:rest + 1] = notes[:, j:j + 1]
+        data2[:, on:rest + 1] = c["velocity"][:, None]
+        time[:, off] = note_duration
+        time[:, rest] = max_note_duration - note_duration
+        keep[:, on:rest + 1] = (j < n)[:, None]
+
+    channel = np.broadcast_to(rows[:, None], (count, SLOTS)).astype(np.uint8)
+    return time[keep], channel[keep], type[keep], data1[keep], data2[keep]
+
+
+def _to_buffer(time, channel, type, data1, data2):
+    buffer = EventBuffer()
+    buffer.time.frombytes(time.tobytes())
+    buffer.channel.frombytes(channel.tobytes())
+    buffer.type.frombytes(type.tobytes())
+    buffer.data1.frombytes(data1.tobytes())
+    buffer.data2.frombytes(data2.tobytes())
+    return buffer
+
+
+def compile_project_batch(project, markers=False):
+    """Vectorized project.compile_project: one loop of the whole project. Returns (tracks, loop_length)."""
+    loop_length = 0
+    blocks, rows, instruments, block_index = [], [], [], []
+    for channel, row in enumerate(project.rows):
+        # Muted rows still count for the loop length
+        loop_length = max(loop_length, row_play_time(row, project.bpm))
+        if row.mute or not row.blocks:
+            continue
+        blocks.extend(row.blocks)
+        rows.extend([channel] * len(row.blocks))
+        instruments.extend([row.instrument] * len(row.blocks))
+        block_index.extend(range(len(row.blocks)))
+
+    tracks = [EventBuffer() for _ in project.rows]
+    if not blocks:
+        return tracks, loop_length
+
+    columns = compile_blocks(blocks, rows, instruments, project.bpm, markers, np.array(block_index))
+    channel = columns[1]
+    # Events are grouped by row: split where the channel changes
+    bounds = np.flatnonzero(np.diff(channel)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(channel)]))
+    for start, end in zip(starts, ends):
+        tracks[int(channel[start])] = _to_buffer(*(column[start:end] for column in columns))
+    return tracks, loop_length
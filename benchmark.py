@@ -0,0 +1,264 @@
+# benchmark.py
+"""
+Benchmark of the playback scheduling strategies on synthetic projects, with a stand-in synth
+(no audio stack needed).
+
+    python benchmark.py                                   # default grid
+    python benchmark.py --rows 1 16 --blocks 10 1000 --duration 3 --json results.json
+
+Strategies:
+  - thread_per_track: one thread per track sleeping between its events (playground.py)
+  - merged_sleep:     all tracks merged and sorted, sleep until each event's offset (the first SynthPlayer.play_midi)
+  - scheduler:        the PlaybackEngine (lazy merge, monotonic deadlines, hybrid sleep/spin)
+
+Every loop is time-scaled to `--duration` seconds, so large projects become stress tests.
+Reported per run: lateness percentiles of the note-ons (actual - intended time), CPU time of the
+process and, in a second pass under tracemalloc, allocated memory.
+"""
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from arp_cache import arpeggio_cache
+from engine import PlaybackEngine
+from event_buffer import EventBuffer, PROGRAM_CHANGE, CONTROL_CHANGE, NOTE_ON, NOTE_OFF
+from project import read_project, compile_project
+from project_generator import generate_project
+from batch_compile import compile_project_batch
+from synth_backend import NullBackend
+from playback_log import logger
+
+
+class TimestampBackend(NullBackend):
+    """Stand-in synth that only stores when each note-on arrived (as cheap as possible)."""
+    def __init__(self):
+        super().__init__()
+        self.noteons = []  # (perf_counter_ns, channel, note)
+
+    def noteon(self, channel, note, velocity):
+        self.noteons.append((time.perf_counter_ns(), channel, note))
+
+
+def scale_tracks(tracks, factor):
+    """Copies of `tracks` with all delta times multiplied by `factor`."""
+    scaled = []
+    for track in tracks:
+        copy = EventBuffer()
+        copy.extend(track)
+        copy.time = array('d', [t * factor for t in track.time])
+        scaled.append(copy)
+    return scaled
+
+
+def intended_noteons(tracks):
+    """Intended note-on times (seconds into the loop) of every channel, in dispatch order."""
+    intended = {}
+    for track in tracks:
+        abs_time = 0.0
+        for delta, channel, type, data1 in zip(track.time, track.channel, track.type, track.data1):
+            abs_time += delta
+            if type == NOTE_ON and data1 != 0:
+                intended.setdefault(channel, []).append(abs_time)
+    return intended
+
+
+def dispatch_direct(backend, sfid, channel, type, data1, data2):
+    """Minimal dispatch for the strategies that do not use the EventDispatcher."""
+    if type == NOTE_ON:
+        if data1 != 0:
+            backend.noteon(channel, data1, max(0, min(data2, 127)))
+    elif type == NOTE_OFF:
+        backend.noteoff(channel, data1)
+    elif type == CONTROL_CHANGE:
+        backend.cc(channel, data1, data2)
+    elif type == PROGRAM_CHANGE:
+        backend.program_select(channel, sfid, 0, data1)
+
+
+def play_thread_per_track(backend, tracks, loop_length):
+    """playground.py: every track plays in a pool thread (4 workers like playground) with sleep(delta)."""
+    sfid = backend.sfload(None)
+
+    def play_track(track):
+        for delta, channel, type, data1, data2 in zip(track.time, track.channel, track.type, track.data1, track.data2):
+            time.sleep(delta)
+            dispatch_direct(backend, sfid, channel, type, data1, data2)
+
+    start = time.perf_counter_ns()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for track in tracks:
+            pool.submit(play_track, track)
+    return start
+
+
+def play_merged_sleep(backend, tracks, loop_length):
+    """The first SynthPlayer.play_midi: merge everything, sort by time, sleep until each event's offset."""
+    sfid = backend.sfload(None)
+    events = []
+    for track in tracks:
+        abs_time = 0.0
+        for delta, channel, type, data1, data2 in zip(track.time, track.channel, track.type, track.data1, track.data2):
+            abs_time += delta
+            events.append((abs_time, channel, type, data1, data2))
+    events.sort(key=lambda event: event[0])
+
+    start = time.perf_counter_ns()
+    start_wall_time = time.time()  # The wall clock, like the original
+    for (event_time, channel, type, data1, data2) in events:
+        wait_time = event_time - (time.time() - start_wall_time)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        dispatch_direct(backend, sfid, channel, type, data1, data2)
+    return start
+
+
+def play_scheduler(backend, tracks, loop_length):
+    """PlaybackEngine.play_midi (what the app uses)."""
+    engine = PlaybackEngine(backend, backend.sfload(None), [0] * 16)
+    engine.start_session()
+    engine.play_midi(tracks, loop_length)
+    return engine.scheduler.epoch_ns  # Start of the loop
+
+
+STRATEGIES = {
+    "thread_per_track": play_thread_per_track,
+    "merged_sleep": play_merged_sleep,
+    "scheduler": play_scheduler,
+}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def run_once(strategy, tracks, loop_length, allocations=True) -> dict:
+    """Play one loop with `strategy` and measure it."""
+    play = STRATEGIES[strategy]
+    intended = intended_noteons(tracks)
+
+    backend = TimestampBackend()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    start_ns = play(backend, tracks, loop_length)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    # Pair the note-ons of every channel in order with their intended times
+    arrived = {}
+    for stamp, channel, note in backend.noteons:
+        arrived.setdefault(channel, []).append(stamp)
+    lateness_ms = []
+    for channel, times in intended.items():
+        for intended_time, stamp in zip(times, arrived.get(channel, [])):
+            lateness_ms.append((stamp - start_ns) / 1e6 - intended_time * 1000)
+    lateness_ms.sort()
+
+    result = {
+        "strategy": strategy,
+        "events": sum(len(track) for track in tracks),
+        "noteons": len(backend.noteons),
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "late_p50_ms": percentile(lateness_ms, 50),
+        "late_p95_ms": percentile(lateness_ms, 95),
+        "late_p99_ms": percentile(lateness_ms, 99),
+        "late_max_ms": lateness_ms[-1] if lateness_ms else 0.0,
+    }
+
+    if allocations:
+        # Second pass: tracemalloc slows everything down, so it is not used for the timings
+        tracemalloc.start()
+        play(TimestampBackend(), tracks, loop_length)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["alloc_peak_kb"] = peak / 1024
+    return result
+
+
+def run_grid(rows_list, blocks_list, strategies, duration=2.0, allocations=True, seed=0):
+    results = []
+    for rows in rows_list:
+        for blocks in blocks_list:
+            project = generate_project(rows, blocks, seed=seed)  # Rate 1: all rows end with the loop
+            tracks, loop_length = compile_project(project)
+            factor = duration / loop_length
+            tracks = scale_tracks(tracks, factor)
+            for strategy in strategies:
+                result = run_once(strategy, tracks, duration, allocations=allocations)
+                result.update(rows=rows, blocks=blocks)
+                results.append(result)
+                print_result(result)
+    return results
+
+
+def bench_load_compile(path):
+    """Time loading a project file and compiling one loop, with a cold and a warm arpeggio cache."""
+    start = time.perf_counter()
+    project = read_project(path)
+    load = time.perf_counter() - start
+
+    arpeggio_cache.clear()
+    start = time.perf_counter()
+    tracks, loop_length = compile_project(project)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compile_project(project)
+    warm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compile_project_batch(project)
+    batch = time.perf_counter() - start
+
+    blocks = sum(len(row.blocks) for row in project.rows)
+    events = sum(len(track) for track in tracks)
+    print(f"{path}: {len(project.rows)} rows, {blocks} blocks, {events} events per loop ({loop_length:.1f}s)")
+    print(f"  load {load * 1000:.1f}ms | compile cold {cold * 1000:.1f}ms ({cold / max(blocks, 1) * 1e6:.1f}us/block) | compile warm {warm * 1000:.1f}ms | batch {batch * 1000:.1f}ms ({batch / max(blocks, 1) * 1e6:.1f}us/block)")
+    return {"path": path, "blocks": blocks, "events": events, "load_s": load, "compile_cold_s": cold, "compile_warm_s": warm, "compile_batch_s": batch}
+
+
+def print_header():
+    print(f"{'strategy':<17}{'rows':>5}{'blocks':>7}{'events':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'cpu s':>8}{'peak kB':>9}")
+
+
+def print_result(result):
+    peak = f"{result['alloc_peak_kb']:.0f}" if "alloc_peak_kb" in result else "-"
+    print(
+        f"{result['strategy']:<17}{result['rows']:>5}{result['blocks']:>7}{result['events']:>8}"
+        f"{result['late_p50_ms']:>9.2f}{result['late_p95_ms']:>9.2f}{result['late_p99_ms']:>9.2f}{result['late_max_ms']:>9.2f}"
+        f"{result['cpu_s']:>8.2f}{peak:>9}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the playback scheduling strategies.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 4, 16], help="Row counts to test.")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10, 100, 1000], help="Blocks per row to test.")
+    parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--duration", type=float, default=2.0, help="Every loop is scaled to this many seconds.")
+    parser.add_argument("--no-alloc", action="store_true", help="Skip the allocation pass (tracemalloc).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", default=None, help="Also write the results to this JSON file.")
+    parser.add_argument("--project", nargs="+", default=None, help="Only time loading and compiling these project files (see project_generator.py).")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)  # No program change messages between the results
+    if args.project:
+        results = [bench_load_compile(path) for path in args.project]
+    else:
+        print_header()
+        results = run_grid(args.rows, args.blocks, args.strategies, duration=args.duration, allocations=not args.no_alloc, seed=args.seed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# engine.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+from playback_log import logger
+from scheduler import Scheduler
+from track_merge import TrackMerger
+from event_dispatcher import EventDispatcher
+
+
+class PlaybackEngine:
+    """
+    Qt-free core of live playback: plays compiled loops (one EventBuffer per row) on a
+    synth backend (see synth_backend.py), timed by the Scheduler.
+    Driven by SynthPlayer/PlaybackThread in the GUI and by headless.py without a GUI.
+    """
+    def __init__(self, fs, sfid, instrument_banks, max_rows=16):
+        self.fs = fs
+        self.max_rows = max_rows
+        self.interrupt_flag = False
+        self.running = False
+        self.scheduler = Scheduler()  # Monotonic clock, keeps one epoch across loops
+        self.dispatcher = EventDispatcher(fs, sfid, instrument_banks)
+
+        # Live edits (see notify_edit): poll_edits(now, loop_length) returns a list of
+        # (swap_time, channel, track) to splice into the loop that is playing
+        self.poll_edits = None
+        self.edit_pending = False  # Set by notify_edit, handled on the playback thread
+        self.loop_edited = False  # The loop compiled ahead of time is stale
+
+    def interrupt(self):
+        self.interrupt_flag = True
+        self.scheduler.interrupt()
+
+    def notify_edit(self):
+        """Called from any thread after the project changed: playback wakes up and polls the edit."""
+        self.edit_pending = True
+        self.loop_edited = True
+        self.scheduler.interrupt()
+
+    def start_session(self):
+        """Start a new playback session: the next loop starts a fresh clock epoch."""
+        self.interrupt_flag = False
+        self.edit_pending = False
+        self.scheduler.reset()
+
+    def play_midi(self, tracks, loop_length=None):
+        """
+        `tracks` is a list of EventBuffers, one track per instrument row.
+        `track.time` holds delta-times (seconds since the last event)!
+        `loop_length` (seconds) is where the next loop starts. Defaults to the time of the last event.
+        Consecutive calls continue on the same clock epoch (see Scheduler), so loops do not drift.
+        """
+        self.play_events(self.prepare_midi(tracks), loop_length)
+
+    @staticmethod
+    def prepare_midi(tracks):
+        """
+        Merge delta-time tracks into one stream of (abs_time, channel, type, data1, data2), ordered by time.
+        The merge is lazy (see TrackMerger): events are produced while they are dispatched.
+        """
+        return TrackMerger(tracks)
+
+    def play_events(self, all_events, loop_length=None):
+        """
+        Play events prepared by prepare_midi(). Can be prepared ahead of time on another thread.
+        Edits notified during the loop are spliced in at the swap time returned by poll_edits.
+        """
+        self.scheduler.begin_loop()
+        dispatch = self.dispatcher.dispatch
+        end = float("inf") if loop_length is None else loop_length
+        swaps = []  # Pending (swap_time, channel, track), sorted by time
+        truncated = set()  # Channels whose swapped track was cut at the end of the loop
+
+        event_time = 0.0
+        while True:
+            if self.edit_pending:
+                self.edit_pending = False
+                if self.poll_edits:
+                    new_swaps = [swap for swap in self.poll_edits(self.scheduler.loop_time(), end) if swap[0] < end]
+                    # A newer track replaces the pending swap of its channel, whose boundary may be later
+                    channels = {channel for _, channel, _ in new_swaps}
+                    swaps = [swap for swap in swaps if swap[1] not in channels] + new_swaps
+                    swaps.sort(key=lambda swap: swap[0])
+            if self.interrupt_flag:
+                self._on_interrupted()
+                return
+
+            next_time = all_events.peek_time()
+            if swaps and (next_time is None or swaps[0][0] <= next_time):
+                # Splice an edited track in at its boundary
+                if self._wait(swaps[0][0], record=False) is None:
+                    continue  # Woken up by an edit or a stop
+                swap_time, channel, track = swaps.pop(0)
+                if not all_events.replace(channel, track, swap_time, until=end):
+                    logger.warning("Dropped an edit of row %s, which is not in the playing loop.", channel)
+                    continue
+                self.dispatcher.release_channel(channel)  # The old version stops at the boundary
+                for type, data1, data2 in track.state_before(swap_time):
+                    dispatch(channel, type, data1, data2)
+                if track.duration() > end:
+                    truncated.add(channel)
+            elif next_time is not None:
+                # Wait until it's time for this event
+                if self._wait(next_time) is None:
+                    continue
+                event_time, channel, type, data1, data2 = next(all_events)
+                dispatch(channel, type, data1, data2)  # Dispatch to fluidsynth
+            else:
+                if loop_length is None:
+                    loop_length = event_time  # Time of the last event
+                # Wait for the end of the loop, so the next loop starts exactly on its boundary
+                if self._wait(loop_length, record=False) is None:
+                    continue
+                break
+
+        for channel in truncated:
+            self.dispatcher.release_channel(channel)  # Notes cut off by the end of the loop
+        self.scheduler.end_loop(loop_length)
+
+    def _wait(self, event_time, record=True):
+        """
+        scheduler.wait_until(), but a wake-up is cleared before the flags are read again:
+        notify_edit() sets edit_pending before it interrupts, so a wake-up that arrives after
+        the flags were read stays set for the next wait and is never lost (nor left set).
+        A wake-up without a pending edit or stop just costs one more pass.
+        """
+        lateness = self.scheduler.wait_until(event_time, record)
+        if lateness is None:
+            self.scheduler.rearm()
+        return lateness
+
+    def _on_interrupted(self):
+        self.interrupt_flag = False
+        self.scheduler.reset()
+        self.dispatcher.release_all()  # Also catches a note dispatched while stop() was releasing
+        self.dispatcher.playhead.clear()
+        logger.info("Playback interrupted.")
+
+    def run(self, compile_loop, loops=None, pipelined=True, poll_edits=None, start_loop=None):
+        """
+        Play loops until stop() is called, or `loops` loops have been played.
+        `compile_loop()` returns (tracks, loop_length, ...) for one loop. In pipelined mode the next
+        loop is compiled on a background worker while the current one plays, and swapped in
+        exactly at the loop boundary. A loop compiled before an edit is compiled again.
+        `poll_edits`, if given, splices edits into the loop that is playing (see notify_edit).
+        `start_loop(loop)`, if given, is called with the compiled loop right before it plays.
+        """
+        self.running = True
+        self.poll_edits = poll_edits
+        self.start_session()
+        compile_loop = self._timed(compile_loop)
+        played = 0
+
+        with ThreadPoolExecutor(max_workers=1) as compiler:
+            next_loop = compile_loop()
+
+            while self.running:
+                tracks, loop_length = next_loop[:2]
+                if start_loop:
+                    start_loop(next_loop)
+                played += 1
+                last_loop = loops is not None and played >= loops
+
+                # Double buffering: compile loop N+1 while loop N plays
+                self.loop_edited = False
+                if pipelined and not last_loop:
+                    pending = compiler.submit(compile_loop)
+
+                self.play_events(self.prepare_midi(tracks), loop_length)
+
+                if not self.running or last_loop:
+                    break
+                if pipelined and not self.loop_edited:
+                    next_loop = pending.result()
+                else:
+                    if pipelined:
+                        pending.result()  # Compiled before an edit: stale
+                    next_loop = compile_loop()  # Cheap after a splice, the arpeggio cache has the edited blocks
+
+        self.running = False
+        self.poll_edits = None
+
+    def _timed(self, compile_loop):
+        """Wrap compile_loop to record its duration in the scheduler's stats."""
+        stats = self.scheduler.stats
+
+        def timed_compile():
+            start = time.perf_counter()
+            loop = compile_loop()
+            stats.record_compile(time.perf_counter() - start)
+            return loop
+        return timed_compile
+
+    @property
+    def stats(self):
+        """Playback instrumentation, see PlaybackStats."""
+        return self.scheduler.stats
+
+    def stop(self):
+        self.running = False
+        self.interrupt()
+        self.stop_all_sounds()
+
+    def stop_all_sounds(self):
+        """
+        Send note-off to the notes that are sounding (tracked by the dispatcher).
+        Useful for stopping early: costs one call per sounding note, not per possible note.
+        """
+        self.dispatcher.release_all()
+
+    def panic(self):
+        """All Sound Off / All Notes Off on every channel, for notes the engine does not know about."""
+        self.dispatcher.panic(self.max_rows)
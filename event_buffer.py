@@ -0,0 +1,159 @@
+# event_buffer.py
+from array import array
+import mido
+
+# Event types
+PROGRAM_CHANGE = 0  # data1 = program
+CONTROL_CHANGE = 1  # data1 = control, data2 = value
+NOTE_ON = 2  # data1 = note, data2 = velocity
+NOTE_OFF = 3  # data1 = note, data2 = velocity
+MARKER = 4  # data1 = row index, data2 = block index (UI playhead)
+
+# Absolute times summed from deltas differ by a few ULP from the same time computed another way
+# (e.g. project.block_starts): times closer than this are the same moment
+TIME_EPSILON = 1e-9
+
+
+class EventBuffer:
+    """
+    Compact, column-oriented event list used between the arpeggiator and the synth.
+
+    Replaces lists of mido.Message in the hot path. Each column is an `array`:
+      - time:    delta time in seconds since the previous event (like mido's msg.time)
+      - channel: MIDI channel (= instrument row)
+      - type:    one of the event type constants above
+      - data1, data2: type dependent, see above
+    mido is only used at the edges (to_mido / from_mido), e.g. for import and export.
+    """
+    __slots__ = ("time", "channel", "type", "data1", "data2")
+
+    def __init__(self):
+        self.time = array('d')
+        self.channel = array('B')
+        self.type = array('B')
+        self.data1 = array('i')
+        self.data2 = array('i')
+
+    def __len__(self):
+        return len(self.type)
+
+    def append(self, time, type, data1=0, data2=0, channel=0):
+        self.time.append(time)
+        self.channel.append(channel)
+        self.type.append(type)
+        self.data1.append(data1)
+        self.data2.append(data2)
+
+    def extend(self, other):
+        """Append all events of another buffer (C-level copy of every column)."""
+        self.time.extend(other.time)
+        self.channel.extend(other.channel)
+        self.type.extend(other.type)
+        self.data1.extend(other.data1)
+        self.data2.extend(other.data2)
+
+    def extend_with_state(self, other, state):
+        """
+        Like extend(), but the program and control changes at the start of `other` that do not
+        change `state` are dropped (their delta time is carried over to the next event).
+        `state` maps (type, data1) -> data2 and is updated, so it can be reused for the next block.
+        """
+        count = len(other.type)
+        i = 0
+        while i < count and other.type[i] in (PROGRAM_CHANGE, CONTROL_CHANGE):
+            i += 1
+        if i == count:  # Nothing to carry the delta times of dropped events over to
+            for type, data1, data2 in zip(other.type, other.data1, other.data2):
+                state[(type, data1)] = data2
+            self.extend(other)
+            return
+
+        carried = 0.0
+        for j in range(i):
+            key = (other.type[j], other.data1[j])
+            if state.get(key) == other.data2[j]:
+                carried += other.time[j]
+            else:
+                state[key] = other.data2[j]
+                self.append(carried + other.time[j], other.type[j], other.data1[j], other.data2[j], other.channel[j])
+                carried = 0.0
+
+        # The rest is copied at C level, like extend()
+        self.append(carried + other.time[i], other.type[i], other.data1[i], other.data2[i], other.channel[i])
+        self.time.extend(other.time[i + 1:])
+        self.channel.extend(other.channel[i + 1:])
+        self.type.extend(other.type[i + 1:])
+        self.data1.extend(other.data1[i + 1:])
+        self.data2.extend(other.data2[i + 1:])
+
+    def set_channel(self, channel):
+        """Assign all events to one channel."""
+        self.channel = array('B', [channel]) * len(self)
+
+    def duration(self):
+        """Sum of all delta times (seconds)."""
+        return sum(self.time)
+
+    def state_before(self, time):
+        """
+        Program and controller values in effect `time` seconds into the buffer, as a list of
+        (type, data1, data2): the last program change, then the last value of each controller.
+        Used to restate the channel state when playback joins a track in the middle.
+        """
+        program = None
+        controls = {}
+        abs_time = 0.0
+        for delta, type, data1, data2 in zip(self.time, self.type, self.data1, self.data2):
+            abs_time += delta
+            if abs_time >= time - TIME_EPSILON:
+                break
+            if type == PROGRAM_CHANGE:
+                program = (PROGRAM_CHANGE, data1, data2)
+            elif type == CONTROL_CHANGE:
+                controls[data1] = data2
+        state = [program] if program else []
+        state.extend((CONTROL_CHANGE, control, value) for control, value in controls.items())
+        return state
+
+    def to_mido(self):
+        """Convert to a list of mido messages (delta times in seconds, like the old tracks)."""
+        messages = []
+        for time, channel, type, data1, data2 in zip(self.time, self.channel, self.type, self.data1, self.data2):
+            if type == NOTE_ON:
+                msg = mido.Message('note_on', channel=channel, note=data1, velocity=max(0, min(data2, 127)), time=time)
+            elif type == NOTE_OFF:
+                msg = mido.Message('note_off', channel=channel, note=data1, velocity=max(0, min(data2, 127)), time=time)
+            elif type == CONTROL_CHANGE:
+                msg = mido.Message('control_change', channel=channel, control=data1, value=data2, time=time)
+            elif type == PROGRAM_CHANGE:
+                msg = mido.Message('program_change', channel=channel, program=data1, time=time)
+            elif type == MARKER:
+                msg = mido.MetaMessage('marker', text=f"{data1}#{data2}", time=time)
+            else:
+                print(f"Unknown event type: {type}")
+                continue
+            messages.append(msg)
+        return messages
+
+    @classmethod
+    def from_mido(cls, messages, channel=0):
+        """Build a buffer from mido messages. Unsupported message types are skipped."""
+        buffer = cls()
+        pending_time = 0.0  # Delta time of skipped messages is carried over to the next event
+        for msg in messages:
+            pending_time += msg.time
+            if msg.type == 'note_on':
+                buffer.append(pending_time, NOTE_ON, msg.note, msg.velocity, channel)
+            elif msg.type == 'note_off':
+                buffer.append(pending_time, NOTE_OFF, msg.note, msg.velocity, channel)
+            elif msg.type == 'control_change':
+                buffer.append(pending_time, CONTROL_CHANGE, msg.control, msg.value, channel)
+            elif msg.type == 'program_change':
+                buffer.append(pending_time, PROGRAM_CHANGE, msg.program, 0, channel)
+            elif msg.type == 'marker':
+                row, block = map(int, msg.text.split("#"))
+                buffer.append(pending_time, MARKER, row, block, channel)
+            else:
+                continue
+            pending_time = 0.0
+        return buffer
@@ -0,0 +1,92 @@
+# event_dispatcher.py
+from event_buffer import PROGRAM_CHANGE, CONTROL_CHANGE, NOTE_ON, NOTE_OFF, MARKER
+from playhead import Playhead
+from playback_log import logger
+
+
+class EventDispatcher:
+    """
+    Sends events (see event_buffer.py) to a fluidsynth synth.
+    Does not care about timing: used by SynthPlayer for live playback and by the offline renderer.
+
+    Keeps the program and controller state of every channel and only sends changes:
+    blocks restate their effects at their start, and most of the time nothing changed.
+    Effects stay active for the whole block (there is no reset on note-off).
+    """
+    def __init__(self, fs, sfid, instrument_banks):
+        self.fs = fs
+        self.sfid = sfid
+        self.instrument_banks = instrument_banks  # list: channel -> bank, shared with the owner
+        self.playhead = Playhead()  # Updated by MARKER events, read by the UI
+        self.active_notes = [set() for _ in range(16)]  # channel -> notes that are sounding
+        self.programs = [None] * 16  # channel -> (bank, program) last sent
+        self.controls = [{} for _ in range(16)]  # channel -> {control: value} last sent
+        self.suppressed = 0  # Redundant program and control changes that were not sent
+
+    def dispatch(self, channel, type, data1, data2):
+        if type == NOTE_ON:
+            if data1 == 0:  # Ignore note 0 (placeholder for silence)
+                return
+
+            velocity = max(0, min(data2, 127))  # clip velocity
+            self.fs.noteon(channel, data1, velocity)
+            self.active_notes[channel].add(data1)
+        elif type == NOTE_OFF:
+            self.fs.noteoff(channel, data1)
+            self.active_notes[channel].discard(data1)
+        elif type == CONTROL_CHANGE:
+            if data1 not in (1, 91, 93):  # Modulation wheel (vibrato), reverb, chorus
+                return
+            controls = self.controls[channel]
+            if controls.get(data1) == data2:
+                self.suppressed += 1
+                return
+            controls[data1] = data2
+            self.fs.cc(channel, data1, data2)
+        elif type == MARKER:
+            self.playhead.blocks[data1] = data2  # Row data1 now plays block data2
+        elif type == PROGRAM_CHANGE:
+            program = (self.instrument_banks[channel], data1)
+            if self.programs[channel] == program:
+                self.suppressed += 1
+                return
+            self.programs[channel] = program
+            logger.info("Bank: %s, Program: %s in channel %s", self.instrument_banks[channel], data1, channel)
+            self.fs.program_select(channel, self.sfid, self.instrument_banks[channel], data1)
+        else:
+            logger.warning("Unknown event type: %s", type)
+
+    def reset_state(self, channel=None):
+        """
+        Forget the program and controller state of one channel (or all), e.g. after the synth
+        was changed directly. The next program and control changes are sent again.
+        """
+        channels = range(16) if channel is None else [channel]
+        for ch in channels:
+            self.programs[ch] = None
+            self.controls[ch].clear()
+
+    def release_channel(self, channel):
+        """Note-off for the notes sounding on one channel."""
+        notes = self.active_notes[channel]
+        for note in list(notes):  # Copy: playback may still be dispatching on its thread
+            # One note at a time, and untracked before its note-off: a note-on dispatched meanwhile
+            # stays tracked (at worst it gets one note-off too many), it is never lost
+            notes.discard(note)
+            self.fs.noteoff(channel, note)
+
+    def release_all(self):
+        """Note-off for the notes sounding on all channels. Costs one call per sounding note."""
+        for channel, notes in enumerate(self.active_notes):
+            if notes:
+                self.release_channel(channel)
+
+    def panic(self, channels=16):
+        """
+        Silence everything, including notes this dispatcher did not send:
+        All Sound Off (also cuts release tails and reverb) and All Notes Off on every channel.
+        """
+        for channel in range(channels):
+            self.active_notes[channel].clear()  # Before the controllers, for the same reason as release_channel
+            self.fs.cc(channel, 120, 0)  # All sound off
+            self.fs.cc(channel, 123, 0)  # All notes off
@@ -0,0 +1,85 @@
+# headless.py
+"""
+Play or render a project without Qt (no QApplication, no display needed).
+
+    python headless.py saves/presentation.json              # play until Ctrl+C
+    python headless.py saves/presentation.json --loops 4
+    python headless.py saves/presentation.json --render out.wav --loops 4
+
+Also available as: python loopeggiator.py --headless saves/presentation.json
+"""
+import os_check  # Ensures this script also works on Windows
+import argparse
+
+from engine import PlaybackEngine
+from synth_backend import create_backend
+from project import read_project
+from batch_compile import compile_project_batch
+
+
+class HeadlessPlayer:
+    """Live playback of a project file through the PlaybackEngine, without any widgets."""
+    def __init__(self, soundfont_path, max_rows=16, backend=None):
+        self.max_rows = max_rows
+        self.fs = backend if backend is not None else create_backend("fluidsynth")  # See synth_backend.py
+        self.sfid = self.fs.sfload(soundfont_path)
+        self.instrument_banks = [0 for i in range(self.max_rows)]
+        self.engine = PlaybackEngine(self.fs, self.sfid, self.instrument_banks, self.max_rows)
+
+    def play(self, project, loops=None):
+        """Play `project` (see project.read_project) for `loops` loops, or until stop()."""
+        for channel, row in enumerate(project.rows):
+            self.instrument_banks[channel] = row.bank
+            self.fs.program_select(channel, self.sfid, row.bank, row.instrument)
+        self.engine.run(lambda: compile_project_batch(project), loops=loops)
+
+    def stop(self):
+        self.engine.stop()
+
+    def close(self):
+        self.fs.delete()
+
+
+def add_arguments(parser):
+    parser.add_argument("-n", "--loops", type=int, default=None, help="Number of loops to play (default: until Ctrl+C).")
+    parser.add_argument("--render", metavar="WAV", default=None, help="Render offline to this WAV file instead of playing.")
+    parser.add_argument("--backend", choices=["fluidsynth", "null"], default="fluidsynth", help="Synth backend for headless playback (null: no audio, for benchmarks).")
+    parser.add_argument("--stats-json", metavar="JSON", default=None, help="Write playback statistics (lateness, backlog, compile time) to this file on exit.")
+
+
+def run(project_path, soundfont_path, loops=None, render=None, stats_json=None, backend="fluidsynth"):
+    project = read_project(project_path)
+
+    if render:
+        from offline_render import OfflineRenderer
+        renderer = OfflineRenderer(soundfont_path)
+        try:
+            length = renderer.render(project, render, loops=loops or 1)
+        finally:
+            renderer.close()
+        print(f"Rendered {length:.2f}s of audio to {render}")
+        return
+
+    player = HeadlessPlayer(soundfont_path, backend=create_backend(backend))
+    try:
+        player.play(project, loops=loops)
+    except KeyboardInterrupt:
+        player.stop()
+    finally:
+        player.close()
+    print(player.engine.stats.summary())
+    if stats_json:
+        player.engine.stats.dump(stats_json)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play a Loopeggiator project without the GUI.")
+    parser.add_argument("project", help="Project file (.json or .loop) to play.")
+    parser.add_argument("-sf", "--soundfont", help="Path to the SoundFont file to use.", default=os_check.default_soundfont())
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    run(args.project, args.soundfont, loops=args.loops, render=args.render, stats_json=args.stats_json, backend=args.backend)
+
+
+if __name__ == "__main__":
+    main()
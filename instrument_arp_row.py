@@ -7,6 +7,8 @@ from arp import Mode
 
 class InstrumentArpPanel(QWidget):
     play_time_changed = Signal()
+    params_changed = Signal()  # A parameter of one of the blocks changed
+    rate_changed = Signal(object, float, float)  # (block, old rate, new rate), 0 = block added/removed
 
     def __init__(self, parent=None, row_container=None):
         super().__init__(parent)
@@ -17,6 +19,7 @@ class InstrumentArpPanel(QWidget):
         self.layout.setAlignment(Qt.AlignLeft)
 
         self.arp_blocks = []
+        self.beats = 0.0  # Play time of the row in beats: sum of 1 / rate, kept up to date incrementally
 
         self.btn_add = QPushButton("+")
         self.btn_add.setToolTip("Add arpeggiator block")
@@ -29,6 +32,26 @@ class InstrumentArpPanel(QWidget):
     def _on_block_changed(self):
         self.play_time_changed.emit()
 
+    def _on_block_rate_changed(self, block, old_rate, new_rate):
+        self.beats += 1 / new_rate - 1 / old_rate
+        self.rate_changed.emit(block, old_rate, new_rate)
+
+    def _connect_block(self, block):
+        block.play_time_changed.connect(self._on_block_changed)
+        block.params_changed.connect(self.params_changed.emit)
+        block.rate_changed.connect(self._on_block_rate_changed)
+        self.beats += 1 / block.rate
+        self.rate_changed.emit(block, 0.0, block.rate)
+
+    def _disconnect_block(self, block):
+        block.play_time_changed.disconnect(self._on_block_changed)
+        block.params_changed.disconnect(self.params_changed.emit)
+        block.rate_changed.disconnect(self._on_block_rate_changed)
+        block.invalidate_cache()
+        block.collapse()  # Recycles its editor
+        block.deleteLater()
+        self.rate_changed.emit(block, block._rate, 0.0)
+
     def add_block(
         self,
         mute=False,
@@ -71,7 +94,7 @@ class InstrumentArpPanel(QWidget):
         self.layout.addWidget(block)
         self.layout.addWidget(self.btn_add)
 
-        block.play_time_changed.connect(self._on_block_changed)
+        self._connect_block(block)
         self.play_time_changed.emit()
 
         self.scroll_plus_button_into_view()
@@ -91,16 +114,46 @@ class InstrumentArpPanel(QWidget):
         self.layout.insertWidget(idx + 1, new_block)
         self.layout.addWidget(self.btn_add)
         
-        new_block.play_time_changed.connect(self._on_block_changed)
+        self._connect_block(new_block)
         self.play_time_changed.emit()
         
         self.scroll_plus_button_into_view()
 
+    def set_blocks(self, blocks):
+        """
+        Replace all blocks by `blocks` (ArpParams, e.g. from project.read_project) in one go:
+        the layout is updated once and play_time_changed is emitted once, at the end.
+        """
+        self.setUpdatesEnabled(False)
+        for block in self.arp_blocks:
+            self.layout.removeWidget(block)
+            self._disconnect_block(block)
+        self.layout.removeWidget(self.btn_add)
+
+        self.arp_blocks = []
+        self.beats = 0.0
+        for block_id, params in enumerate(blocks):
+            config = dict(zip(params._fields, params))
+            for key in ("variants_active", "chords_active", "variants"):
+                config[key] = list(config[key])  # The Arpeggiator edits them in place
+            block = ArpeggiatorBlockWidget(
+                parent=self,
+                id=block_id,
+                volume_line_signal=self.row_container.volume_line_changed,
+                **config
+            )
+            self.arp_blocks.append(block)
+            self.layout.addWidget(block)
+            self._connect_block(block)
+        self.beats = sum(1 / block.rate for block in self.arp_blocks)  # Exact, no float drift
+
+        self.layout.addWidget(self.btn_add)
+        self.setUpdatesEnabled(True)
+        self.play_time_changed.emit()
+
     def set_block_width(self, max_rate):
-        min_block_width = ArpeggiatorBlockWidget.minimal_block_width
         for block in self.arp_blocks:
-            arp_width = min_block_width * (max_rate / block.rate)
-            block.update_size(arp_width)  # <-- reapply total width (loop-based)
+            block.update_width(max_rate)  # Only blocks whose width changed are resized
 
     def _rebuild_layout(self):
         # Remove all widgets
@@ -135,13 +188,13 @@ class InstrumentArpPanel(QWidget):
     def remove_block(self, block):
         if block in self.arp_blocks:
             self.layout.removeWidget(block)
-            block.play_time_changed.disconnect(self._on_block_changed)
-            block.deleteLater()
+            self._disconnect_block(block)
             self.arp_blocks.remove(block)
 
             for i, blk in enumerate(self.arp_blocks):
                 blk.id = i
 
+            self.beats = sum(1 / blk.rate for blk in self.arp_blocks)  # Exact again, no float drift
             self.play_time_changed.emit()
 
     def scroll_plus_button_into_view(self):
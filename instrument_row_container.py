@@ -3,11 +3,14 @@ from PySide6.QtWidgets import QHBoxLayout, QFrame, QSizePolicy
 from PySide6.QtCore import Signal
 from instrument_settings_widget import InstrumentSettingsPanel
 from instrument_arp_row import InstrumentArpPanel
+from project import ProjectRow
 
 
 class InstrumentRowContainer(QFrame):
     play_time_changed = Signal()
     volume_line_changed = Signal()
+    rate_changed = Signal(object, float, float)  # See InstrumentArpPanel.rate_changed
+    edited = Signal()  # Anything playback depends on changed, see snapshot()
 
     def __init__(self, synth, row_id, parent=None):
         super().__init__(parent)
@@ -16,6 +19,7 @@ class InstrumentRowContainer(QFrame):
         self.synth = synth
         self.id = row_id
         self.instrument = 0
+        self._snapshot = None  # Cached ProjectRow, cleared on every edit
 
         self.settings_panel = InstrumentSettingsPanel(synth, self.id, parent=self)
         self.settings_panel.update_instrument_list()
@@ -27,6 +31,14 @@ class InstrumentRowContainer(QFrame):
         self.settings_panel.btn_del.clicked.connect(self.del_instrument)
 
         self.arp_panel.play_time_changed.connect(self._on_block_changed)
+        self.arp_panel.rate_changed.connect(self.rate_changed.emit)
+        self.volume_line_changed.connect(self.invalidate_cache)
+
+        # Every edit playback depends on invalidates the snapshot
+        self.arp_panel.params_changed.connect(self._on_edited)
+        self.arp_panel.play_time_changed.connect(self._on_edited)
+        self.volume_line_changed.connect(self._on_edited)
+        self.mute_checkbox.toggled.connect(self._on_edited)
 
         self.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)
         self.setLineWidth(1)
@@ -60,6 +72,31 @@ class InstrumentRowContainer(QFrame):
     def _on_block_changed(self):
         self.play_time_changed.emit()
 
+    def _on_edited(self):
+        self._snapshot = None
+        self.edited.emit()
+
+    def snapshot(self):
+        """
+        Immutable copy of this row for the playback thread (see project.ProjectRow).
+        Only built on the GUI thread, and rebuilt only after an edit.
+        """
+        if self._snapshot is None:
+            self._snapshot = ProjectRow(
+                mute=self.mute_checkbox.isChecked(),
+                volume=self.velocity,
+                instrument=self.instrument,
+                bank=self.synth.instrument_banks[self.id],
+                blocks=tuple(block.arp.params() for block in self.arp_panel.arp_blocks),
+                block_ids=tuple(block.uid for block in self.arp_panel.arp_blocks),
+            )
+        return self._snapshot
+
+    def invalidate_cache(self):
+        """Drop the compiled arpeggios of all blocks in this row."""
+        for block in self.arp_panel.arp_blocks:
+            block.invalidate_cache()
+
     def update_arp_volumes(self):
         volume = self.settings_panel.volume_slider.value()
         for arp_block in self.arp_panel.arp_blocks:
@@ -77,18 +114,29 @@ class InstrumentRowContainer(QFrame):
             bank = 0
 
         self.synth.change_instrument(self.id, self.instrument, bank=bank)
+        self._on_edited()
+
+    def load(self, row, preset_index):
+        """
+        Show a project.ProjectRow. `preset_index` is its index in the instrument combo box
+        (see SynthPlayer.preset_index). The widgets are set with their signals blocked,
+        so the row is only edited once per part instead of once per widget.
+        """
+        settings = self.settings_panel
+        widgets = (self.mute_checkbox, settings.volume_slider, settings.instrument_combo)
+        for widget in widgets:
+            widget.blockSignals(True)
+        self.mute_checkbox.setChecked(row.mute)
+        settings.volume_slider.setValue(row.volume)
+        settings.instrument_combo.setCurrentIndex(preset_index)
+        for widget in widgets:
+            widget.blockSignals(False)
+
+        self.change_instrument(preset_index)
+        self.arp_panel.set_blocks(row.blocks)  # Blocks already have the row volume
 
     def get_play_time(self, bpm):
-        return sum(block.get_play_time(bpm) for block in self.arp_panel.arp_blocks)
-
-    def get_all_arpeggios(self, bpm):
-        all_notes = []
-        total_time = 0
-        for block in self.arp_panel.arp_blocks:
-            notes, duration = block.get_arpeggio(bpm, self.instrument)
-            all_notes.extend(notes)
-            total_time += duration
-        return all_notes, total_time
+        return self.arp_panel.beats * (60 / bpm)
 
     def set_block_width(self, max_rate):
         self.arp_panel.set_block_width(max_rate)
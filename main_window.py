@@ -0,0 +1,348 @@
+# main_window.py
+from collections import Counter
+
+from PySide6.QtWidgets import (
+    QMainWindow,
+    QWidget,
+    QVBoxLayout,
+    QPushButton,
+    QScrollArea,
+    QStyle
+)
+from PySide6.QtCore import Qt, QTimer
+
+from instrument_row_container import InstrumentRowContainer
+from top_bar import TopBarWidget
+from synthplayer import SynthPlayer
+from playback_thread import PlaybackThread
+from project import Project
+
+
+class LoopArpeggiatorMainWindow(QMainWindow):
+    """
+    A main window with:
+      - A top bar (play/stop button, BPM spin, save/load buttons)
+      - A single QScrollArea for everything (so only one horizontal scrollbar)
+      - A vertical list of InstrumentRowWidgets inside that scroll area
+      - A button at the bottom to add more instruments
+    """
+    def __init__(self, soundfont_path, stats_path=None):
+        # ===================== Functionality ========================
+        self.synth = SynthPlayer(soundfont_path, max_rows=16)
+        self.stats_path = stats_path  # Playback statistics are written there on exit (JSON)
+
+        # ==================== Base Window Setup =====================
+        super().__init__()
+
+        # Immutable snapshot of the project, read by the playback thread (see publish_snapshot)
+        self.snapshot = Project(bpm=60, rows=())
+        self._publish_timer = QTimer(self)
+        self._publish_timer.setSingleShot(True)
+        self._publish_timer.setInterval(0)  # Coalesces a burst of edits into one snapshot
+        self._publish_timer.timeout.connect(self.publish_snapshot)
+
+        # Block widths and loop length, updated incrementally (see update_layout)
+        self.rate_counts = Counter()  # rate -> number of blocks with that rate, for the max rate
+        self._max_rate = 0
+        self._resize_blocks = set()  # Blocks whose rate changed since the last layout pass
+        self._layout_timer = QTimer(self)
+        self._layout_timer.setSingleShot(True)
+        self._layout_timer.setInterval(16)  # At most one layout pass per frame
+        self._layout_timer.timeout.connect(self.update_layout)
+
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setWindowTitle("Arpeggiator Loop Station")
+        self.resize(1200, 600)
+
+        # ============================================================
+        # Create a top-level widget with a vertical layout.
+        # The top bar goes at the top, then the QScrollArea underneath.
+        # ============================================================
+        main_widget = QWidget()
+        self.main_layout = QVBoxLayout(main_widget)
+        self.main_layout.setContentsMargins(5, 5, 5, 5)
+
+        # ============================================================
+        # 1) TOP BAR
+        # ============================================================
+        self.top_bar = TopBarWidget(self)
+        self.main_layout.addWidget(self.top_bar)
+        self.top_bar.bpm_changed.connect(self._on_play_time_changed)  # Connect to signal
+        self.top_bar.bpm_changed.connect(self.schedule_publish)
+
+        # ============================================================
+        # 2) CENTRAL AREA (scrollable Instrument rows + "Add Instrument")
+        # ============================================================
+        self.container = QWidget()
+        self.vlayout = QVBoxLayout(self.container)
+        self.vlayout.setContentsMargins(5, 5, 5, 5)
+        self.vlayout.setAlignment(Qt.AlignTop)
+
+        # We'll keep a list of row widgets
+        self.instrument_rows = []
+
+        # "Add Instrument" button at bottom
+        self.btn_add_instrument = QPushButton("Add Instrument")
+        self.btn_add_instrument.clicked.connect(self.add_instrument)
+
+        # Add the first instrument row by default
+        self.add_instrument()
+
+        # Then add the button at the bottom
+        self.vlayout.addWidget(self.btn_add_instrument, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        # Put the container inside a single QScrollArea
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.setWidget(self.container)
+        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+
+        # Add the scroll area to main_layout
+        self.main_layout.addWidget(self.scroll_area)
+
+        # Finally, set main_widget as the central widget
+        self.setCentralWidget(main_widget)
+
+        # Playback thread
+        self.playback_thread = None
+
+        # Playhead: one repaint per frame, of the rows whose block changed
+        self._highlighted = {}  # row -> highlighted ArpeggiatorBlockWidget
+        self.playhead_timer = QTimer(self)
+        self.playhead_timer.setInterval(16)  # ~60 Hz
+        self.playhead_timer.timeout.connect(self.update_playhead)
+
+        # Live playback statistics in the top bar
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start()
+        self.top_bar.quantize_changed.connect(self._on_quantize_changed)
+
+        # Connect the play button to the playback function
+        self.top_bar.play_button.toggled.connect(self.on_play_toggled)
+
+        self.publish_snapshot()
+
+    def publish_snapshot(self):
+        """
+        Build a new immutable Project from the widgets and swap it in with a single assignment.
+        The playback thread picks it up when it compiles the next loop.
+        """
+        self._publish_timer.stop()
+        self.snapshot = Project(
+            bpm=self.top_bar.bpm,
+            rows=tuple(row.snapshot() for row in self.instrument_rows)
+        )
+        if self.playback_thread:
+            self.playback_thread.notify_edit()  # Splice the edit into the loop that is playing
+
+    def schedule_publish(self):
+        """Publish a new snapshot once control returns to the event loop."""
+        self._publish_timer.start()
+
+    def _on_play_time_changed(self):
+        """Called when the play time changes in any row."""
+        if not self._layout_timer.isActive():
+            self._layout_timer.start()
+
+    def _on_rate_changed(self, block, old_rate, new_rate):
+        """Keep rate_counts up to date. A rate of 0 means the block was added or removed."""
+        if old_rate:
+            self.rate_counts[old_rate] -= 1
+            if not self.rate_counts[old_rate]:
+                del self.rate_counts[old_rate]
+        if new_rate:
+            self.rate_counts[new_rate] += 1
+            self._resize_blocks.add(block)
+        else:
+            self._resize_blocks.discard(block)
+        self._on_play_time_changed()
+
+    def update_layout(self):
+        """One layout pass: loop length, then the widths of the blocks that need it."""
+        self._layout_timer.stop()
+        self.update_loop_length()
+        max_rate = max(self.rate_counts) if self.rate_counts else 0
+        if max_rate != self._max_rate:
+            self._max_rate = max_rate
+            self.setArpBlockWidth()  # Every width depends on the max rate
+        else:
+            for block in self._resize_blocks:
+                block.update_width(max_rate)
+        self._resize_blocks.clear()
+
+    def on_play_toggled(self, checked):
+        """Switch between play and stop icons depending on toggle state."""
+        if checked:
+            self.top_bar.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaStop))
+            self.start_playback()
+        else:
+            self.top_bar.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+            self.stop_playback()
+
+    def start_playback(self):
+        if self.playback_thread and self.playback_thread.isRunning():
+            return  # already running
+
+        self.publish_snapshot()
+        self.playback_thread = PlaybackThread(
+            get_snapshot=lambda: self.snapshot,
+            synth=self.synth,
+            quantize=self.top_bar.quantize
+        )
+        self.playback_thread.start()
+        self.playhead_timer.start()
+
+    def _on_quantize_changed(self, _index):
+        if self.playback_thread:
+            self.playback_thread.quantize = self.top_bar.quantize
+
+    def stop_playback(self):
+        if self.playback_thread:
+            self.playback_thread.stop()
+            self.playback_thread.wait()
+            self.playback_thread = None
+        self.playhead_timer.stop()
+        self.synth.playhead.clear()
+        self.update_playhead()
+        
+    def closeEvent(self, event):
+        """Called when the user closes the main window."""
+        self.stop_playback()
+        if self.stats_path:
+            self.synth.engine.stats.dump(self.stats_path)
+            print(f"Playback statistics written to {self.stats_path}")
+        super().closeEvent(event)
+
+    def setArpBlockWidth(self):
+        """Set the width of the arpeggiator blocks based on their rate."""
+        for row in self.instrument_rows:
+            row.set_block_width(self._max_rate)
+
+    def add_instrument(self):
+        if len(self.instrument_rows) >= self.synth.max_rows:
+            return
+        
+        row = InstrumentRowContainer(self.synth, len(self.instrument_rows), parent=self)
+        self.instrument_rows.append(row)
+        index_for_button = self.vlayout.count() - 1
+        self.vlayout.insertWidget(index_for_button, row)
+        row.play_time_changed.connect(self._on_play_time_changed)  # Connect to signal
+        row.rate_changed.connect(self._on_rate_changed)
+        row.edited.connect(self.schedule_publish)
+        for block in row.arp_blocks:  # Added before the signal was connected
+            self._on_rate_changed(block, 0.0, block.rate)
+        self._on_play_time_changed()
+        self.schedule_publish()
+
+        QTimer.singleShot(10, lambda: self.scroll_area.verticalScrollBar().setValue(
+            self.scroll_area.verticalScrollBar().maximum()))  # Scroll to the bottom
+        
+        if len(self.instrument_rows) >= self.synth.max_rows:
+            self.btn_add_instrument.hide()  # Hide the button if max rows reached
+            
+        return row
+
+    def del_instrument(self, instrument):
+        """
+        Remove an instrument row from the main window without stopping playback.
+        Args:
+            instrument: The InstrumentRowWidget to remove
+        """
+        if instrument in self.instrument_rows:
+            # Get the row index
+            row_index = self.instrument_rows.index(instrument)
+            
+            # Remove from layout and disconnect signals
+            self.vlayout.removeWidget(instrument)
+            instrument.play_time_changed.disconnect(self._on_play_time_changed)
+            instrument.rate_changed.disconnect(self._on_rate_changed)
+            instrument.edited.disconnect(self.schedule_publish)
+            for block in instrument.arp_blocks:
+                self._on_rate_changed(block, block.rate, 0.0)
+            
+            # Clean up the instrument's resources
+            instrument.invalidate_cache()  # Its blocks stop owning cache entries
+            instrument.deleteLater()
+            
+            # Remove from our list
+            self.instrument_rows.remove(instrument)
+            
+            # Update channel IDs for remaining instruments
+            for i, row in enumerate(self.instrument_rows):
+                row.id = i
+                # Update the instrument in the synth to use the new channel
+                row.synth.change_instrument(i, row.instrument)
+                row._on_edited()
+            self.schedule_publish()  # Also when no row is left to emit edited
+            
+            # Update the loop length and block widths
+            self._on_play_time_changed()
+
+            if len(self.instrument_rows) < self.synth.max_rows:
+                self.btn_add_instrument.show()  # Show the button again if we have space
+
+    def update_loop_length(self):
+        """Update the loop length label in the top bar."""
+        if not self.instrument_rows:
+            self.top_bar.set_loop_length(0)
+            return
+        
+        times = [row.get_play_time(self.top_bar.bpm) for row in self.instrument_rows]
+        max_time = max(times) if times else 0
+
+        self.top_bar.set_loop_length(max_time)
+
+    def update_stats(self):
+        self.top_bar.set_stats(self.synth.engine.stats.summary())
+
+    def update_playhead(self):
+        """Move the highlight of every row to the block that is playing (see playhead.Playhead)."""
+        positions = self.synth.playhead.read()
+        highlighted = {}
+        for row_idx, row in enumerate(self.instrument_rows):
+            block_idx = positions[row_idx]
+            block = row.arp_blocks[block_idx] if 0 <= block_idx < len(row.arp_blocks) else None
+            previous = self._highlighted.get(row)
+            if previous is not block:
+                if previous is not None and previous in row.arp_blocks:  # May have been removed
+                    previous.set_highlighted(False)
+                if block is not None:
+                    block.set_highlighted(True)
+            if block is not None:
+                highlighted[row] = block
+        self._highlighted = highlighted
+
+    def keyPressEvent(self, event):
+        """Mute/unmute instrument rows using number keys [And t, [y/z], u, i, o, p]. Escape silences everything."""
+        if event.key() == Qt.Key_Escape:
+            self.synth.panic()
+            return
+
+        key_map = {
+            Qt.Key_1: 0,
+            Qt.Key_2: 1,
+            Qt.Key_3: 2,
+            Qt.Key_4: 3,
+            Qt.Key_5: 4,
+            Qt.Key_6: 5,
+            Qt.Key_7: 6,
+            Qt.Key_8: 7,
+            Qt.Key_9: 8,
+            Qt.Key_0: 9,
+            Qt.Key_T: 10,
+            Qt.Key_Z: 11,
+            Qt.Key_Y: 11,  # support QWERTY, QWERTZ and AZERTY
+            Qt.Key_U: 12,
+            Qt.Key_I: 13,
+            Qt.Key_O: 14,
+            Qt.Key_P: 15,
+        }
+
+        if event.key() in key_map:
+            idx = key_map[event.key()]
+            if idx < len(self.instrument_rows):
+                checkbox = self.instrument_rows[idx].mute_checkbox
+                checkbox.setChecked(not checkbox.isChecked())
@@ -0,0 +1,99 @@
+# midi_export.py
+"""
+Export compiled loops (one EventBuffer per row, see project.compile_project)
+as a type-1 Standard MIDI File: a tempo track followed by one track per channel.
+"""
+import argparse
+import mido
+import numpy as np
+
+from event_buffer import PROGRAM_CHANGE, CONTROL_CHANGE, NOTE_ON, NOTE_OFF
+from project import read_project
+from batch_compile import compile_project_batch
+
+
+def seconds_to_ticks(times, bpm, ticks_per_beat):
+    """Vectorized conversion of absolute times (seconds) to absolute ticks at a constant tempo."""
+    return np.rint(np.asarray(times, dtype=np.float64) * (bpm / 60 * ticks_per_beat)).astype(np.int64)
+
+
+def track_to_midi(track, channel, bpm, loop_length, repetitions=1, ticks_per_beat=480, bank=0, name=None):
+    """
+    Convert one delta-time EventBuffer (one loop) to a mido.MidiTrack with `repetitions` loops.
+    Markers and silence placeholders (note 0) are dropped.
+    """
+    midi_track = mido.MidiTrack()
+    if name:
+        midi_track.append(mido.MetaMessage('track_name', name=name, time=0))
+    if 0 < bank < 128:
+        midi_track.append(mido.Message('control_change', channel=channel, control=0, value=bank, time=0))  # Bank select
+
+    types = np.asarray(track.type)
+    data1 = np.asarray(track.data1)
+    data2 = np.asarray(track.data2)
+    keep = (types == PROGRAM_CHANGE) | (types == CONTROL_CHANGE) | (((types == NOTE_ON) | (types == NOTE_OFF)) & (data1 > 0))
+
+    # Absolute times of one loop, then one row per repetition
+    loop_times = np.cumsum(np.asarray(track.time))[keep]
+    offsets = np.arange(repetitions, dtype=np.float64)[:, None] * loop_length
+    ticks = seconds_to_ticks((offsets + loop_times).ravel(), bpm, ticks_per_beat)
+    deltas = np.diff(ticks, prepend=0).tolist()
+
+    types = np.tile(types[keep], repetitions).tolist()
+    data1 = np.tile(data1[keep], repetitions).tolist()
+    data2 = np.tile(np.clip(data2[keep], 0, 127), repetitions).tolist()
+
+    for delta, type, d1, d2 in zip(deltas, types, data1, data2):
+        if type == NOTE_ON:
+            msg = mido.Message('note_on', channel=channel, note=d1, velocity=d2, time=delta)
+        elif type == NOTE_OFF:
+            msg = mido.Message('note_off', channel=channel, note=d1, velocity=d2, time=delta)
+        elif type == CONTROL_CHANGE:
+            msg = mido.Message('control_change', channel=channel, control=d1, value=d2, time=delta)
+        else:
+            msg = mido.Message('program_change', channel=channel, program=d1, time=delta)
+        midi_track.append(msg)
+
+    # End the track exactly at the end of the last loop
+    end_tick = int(seconds_to_ticks([repetitions * loop_length], bpm, ticks_per_beat)[0])
+    last_tick = int(ticks[-1]) if len(ticks) else 0
+    midi_track.append(mido.MetaMessage('end_of_track', time=max(0, end_tick - last_tick)))
+    return midi_track
+
+
+def tracks_to_midi_file(tracks, bpm, loop_length, repetitions=1, ticks_per_beat=480, banks=None):
+    """Build a type-1 mido.MidiFile from one EventBuffer per channel."""
+    midi_file = mido.MidiFile(type=1, ticks_per_beat=ticks_per_beat)
+
+    tempo_track = mido.MidiTrack()
+    tempo_track.append(mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(bpm), time=0))
+    tempo_track.append(mido.MetaMessage('time_signature', numerator=4, denominator=4, time=0))
+    midi_file.tracks.append(tempo_track)
+
+    for channel, track in enumerate(tracks):
+        bank = banks[channel] if banks else 0
+        midi_file.tracks.append(track_to_midi(
+            track, channel, bpm, loop_length,
+            repetitions=repetitions, ticks_per_beat=ticks_per_beat, bank=bank, name=f"Row {channel + 1}"
+        ))
+    return midi_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a Loopeggiator project as a Standard MIDI File.")
+    parser.add_argument("project", help="Project file (.json or .loop) to export.")
+    parser.add_argument("output", help="MIDI file (.mid) to write.")
+    parser.add_argument("-n", "--loops", type=int, default=1, help="Number of loop repetitions to export.")
+    parser.add_argument("--ppq", type=int, default=480, help="Ticks per quarter note.")
+    args = parser.parse_args()
+
+    project = read_project(args.project)
+    tracks, loop_length = compile_project_batch(project)
+    banks = [row.bank for row in project.rows]
+    midi_file = tracks_to_midi_file(tracks, project.bpm, loop_length, repetitions=args.loops, ticks_per_beat=args.ppq, banks=banks)
+    midi_file.save(args.output)
+    print(f"Exported {args.loops} loop(s) of {loop_length:.2f}s to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# offline_render.py
+import os_check  # Ensures this script also works on Windows
+import argparse
+import os
+import time
+import wave
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+
+from project import read_project, BINARY_EXTENSION
+from batch_compile import compile_project_batch
+from event_dispatcher import EventDispatcher
+from track_merge import TrackMerger
+from synth_backend import FluidSynthBackend
+
+
+class OfflineRenderer:
+    """
+    Renders a project to a WAV file without an audio device.
+
+    fluidsynth's audio driver is never started: samples are pulled with Synth.get_samples()
+    between events, so rendering runs as fast as the CPU allows. Audio is written in blocks of
+    at most `chunk_size` frames, so memory use does not grow with the length of the render.
+    """
+    def __init__(self, soundfont_path, sample_rate=44100, chunk_size=1024, max_rows=16):
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+
+        self.fs = FluidSynthBackend(sample_rate, audio=False)
+        self.sfid = self.fs.sfload(soundfont_path)
+        self.instrument_banks = [0 for i in range(self.max_rows)]
+        self.dispatcher = EventDispatcher(self.fs, self.sfid, self.instrument_banks)
+
+        self._wav = None
+        self._frames_written = 0
+
+    def close(self):
+        self.fs.delete()
+
+    def _render_until(self, frame):
+        """Synthesize and write audio up to (excluding) the given frame."""
+        while self._frames_written < frame:
+            frames = min(self.chunk_size, frame - self._frames_written)
+            samples = self.fs.get_samples(frames)  # Interleaved stereo int16
+            self._wav.writeframes(samples.tobytes())
+            self._frames_written += frames
+
+    def render(self, project, out_path, loops=1, tail=1.0):
+        """
+        Render `loops` repetitions of `project` (see project.read_project) into `out_path`.
+        `tail` seconds of silence are rendered at the end to let notes and reverb ring out.
+        Returns the rendered length in seconds.
+        """
+        self.dispatcher.release_all()
+        self.fs.system_reset()  # The renderer may be reused: start without ringing voices and controller state
+        self.dispatcher.reset_state()
+        for channel, row in enumerate(project.rows):
+            self.instrument_banks[channel] = row.bank
+            self.fs.program_select(channel, self.sfid, row.bank, row.instrument)
+
+        with wave.open(out_path, "wb") as wav:
+            wav.setnchannels(2)
+            wav.setsampwidth(2)  # 16 bit
+            wav.setframerate(self.sample_rate)
+            self._wav = wav
+            self._frames_written = 0
+
+            loop_start = 0.0  # seconds
+            for loop in range(loops):
+                # Compiled per loop, so random mode blocks are reshuffled like in live playback
+                tracks, loop_length = compile_project_batch(project)
+                for (event_time, channel, type, data1, data2) in TrackMerger(tracks):
+                    self._render_until(round((loop_start + event_time) * self.sample_rate))
+                    self.dispatcher.dispatch(channel, type, data1, data2)
+                loop_start += loop_length
+                self._render_until(round(loop_start * self.sample_rate))
+
+            self.dispatcher.release_all()
+            self._render_until(round((loop_start + tail) * self.sample_rate))
+            self._wav = None
+
+        return self._frames_written / self.sample_rate
+
+
+# Renderer of the current batch worker process, created once per process by _init_worker
+_worker_renderer = None
+
+
+def _init_worker(soundfont_path, sample_rate, chunk_size):
+    global _worker_renderer
+    _worker_renderer = OfflineRenderer(soundfont_path, sample_rate=sample_rate, chunk_size=chunk_size)
+    # Deletes the fluidsynth instance when the worker exits. Not atexit: forked workers end with
+    # os._exit() and skip it, multiprocessing runs its finalizers with every start method.
+    Finalize(None, _worker_renderer.close, exitpriority=0)
+
+
+def _render_in_worker(project_path, out_path, loops, tail):
+    start = time.perf_counter()
+    length = _worker_renderer.render(read_project(project_path), out_path, loops=loops, tail=tail)
+    return length, time.perf_counter() - start
+
+
+def render_directory(project_dir, out_dir, soundfont_path, loops=1, sample_rate=44100, chunk_size=1024, tail=1.0, jobs=None):
+    """
+    Render every project (.json or .loop) in `project_dir` to `out_dir/<name>.wav` on a process pool.
+    Projects that only differ by their extension (foo.json and foo.loop) keep it: foo.json.wav, foo.loop.wav.
+    Each worker owns one fluidsynth instance and loads the soundfont only once.
+    Returns the number of projects that failed.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    project_files = sorted(name for name in os.listdir(project_dir) if name.endswith((".json", BINARY_EXTENSION)))
+    if not project_files:
+        print(f"No projects found in {project_dir}")
+        return 0
+
+    stems = Counter(os.path.splitext(name)[0] for name in project_files)
+    failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(soundfont_path, sample_rate, chunk_size)
+    ) as pool:
+        futures = {}
+        for name in project_files:
+            stem = os.path.splitext(name)[0]
+            out_path = os.path.join(out_dir, (stem if stems[stem] == 1 else name) + ".wav")
+            future = pool.submit(_render_in_worker, os.path.join(project_dir, name), out_path, loops, tail)
+            futures[future] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                length, elapsed = future.result()
+                print(f"Rendered {name}: {length:.2f}s of audio in {elapsed:.2f}s")
+            except Exception as e:
+                failed += 1
+                print(f"Failed to render {name}: {e}")
+
+    print(f"Rendered {len(project_files) - failed}/{len(project_files)} projects in {time.perf_counter() - start:.2f}s")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a Loopeggiator project to WAV, without an audio device.")
+    parser.add_argument("project", help="Project file (.json or .loop) to render, or a directory of projects (batch mode).")
+    parser.add_argument("output", help="WAV file to write, or the output directory in batch mode.")
+    parser.add_argument("-sf", "--soundfont", help="Path to the SoundFont file to use.", default=os_check.default_soundfont())
+    parser.add_argument("-n", "--loops", type=int, default=1, help="Number of loop repetitions to render.")
+    parser.add_argument("-r", "--sample-rate", type=int, default=44100, help="Sample rate in Hz.")
+    parser.add_argument("-c", "--chunk-size", type=int, default=1024, help="Maximum number of frames synthesized per block.")
+    parser.add_argument("--tail", type=float, default=1.0, help="Seconds rendered after the last loop.")
+    parser.add_argument("--row", type=int, default=None, help="Render only this row (1 = first row), e.g. to preview one instrument.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes in batch mode (default: one per CPU).")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.project):
+        if args.row is not None:
+            parser.error("--row renders a single project, not a directory")
+        failed = render_directory(
+            args.project, args.output, args.soundfont,
+            loops=args.loops, sample_rate=args.sample_rate, chunk_size=args.chunk_size, tail=args.tail, jobs=args.jobs
+        )
+        raise SystemExit(1 if failed else 0)
+
+    if args.row is not None and args.row < 1:
+        parser.error("--row starts at 1")
+    # A .loop file only decodes the blocks of that row
+    project = read_project(args.project, rows=None if args.row is None else [args.row - 1])
+    renderer = OfflineRenderer(args.soundfont, sample_rate=args.sample_rate, chunk_size=args.chunk_size)
+    try:
+        start = time.perf_counter()
+        length = renderer.render(project, args.output, loops=args.loops, tail=args.tail)
+        elapsed = time.perf_counter() - start
+    finally:
+        renderer.close()
+    print(f"Rendered {length:.2f}s of audio to {args.output} in {elapsed:.2f}s ({length / max(elapsed, 1e-9):.1f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,12 @@ def is_windows():
     return platform.system() == "Windows"
 
 
+def default_soundfont():
+    if is_windows():
+        return r"C:\tools\fluidsynth\soundfonts\FluidR3_GM.sf2"
+    return "/usr/share/sounds/sf2/FluidR3_GM.sf2"
+
+
 def load_fluidsynth_dll():
     if platform.system() == "Windows":
         # Add the Fluidsynth bin directory
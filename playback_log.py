@@ -0,0 +1,21 @@
+# playback_log.py
+"""
+Non-blocking logging for the playback path.
+
+Records are put on a queue by a QueueHandler (cheap, never touches the console) and written by
+a QueueListener on its own thread, so a slow terminal cannot delay the dispatch of events.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+
+_queue = queue.SimpleQueue()
+_listener = logging.handlers.QueueListener(_queue, logging.StreamHandler())
+_listener.start()
+atexit.register(_listener.stop)
+
+logger = logging.getLogger("loopeggiator.playback")
+logger.addHandler(logging.handlers.QueueHandler(_queue))
+logger.setLevel(logging.INFO)
+logger.propagate = False
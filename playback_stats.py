@@ -0,0 +1,157 @@
+# playback_stats.py
+import json
+import math
+import time
+from array import array
+from bisect import bisect_left
+
+
+class PlaybackStats:
+    """
+    Instrumentation of live playback, filled by the Scheduler and the PlaybackEngine.
+
+    - Lateness of every dispatched event (dispatch time - deadline) as a histogram, and event by
+      event for the last loop (at most max_loop_events), which gives its exact percentiles
+    - Backlog: events in a row that were dispatched more than backlog_threshold_ns late
+      (events sharing the previous event's deadline, like the notes of a chord, do not count)
+    - Compile time of the loops (last, mean and max)
+    - Events per second of played time, including the loop that is playing
+    Recording costs a few integer operations per event. snapshot() is safe to call from the GUI thread.
+    """
+    bucket_edges_us = (50, 100, 250, 500, 1000, 2000, 5000, 10000, 20000, 50000)  # Upper edges, the last bucket is open
+
+    def __init__(self, backlog_threshold_ns=2_000_000, max_loop_events=100_000):
+        self.backlog_threshold_ns = backlog_threshold_ns  # Usually the scheduler's spin window
+        self.max_loop_events = max_loop_events  # Events of a loop past this are only in the histogram
+        self.reset()
+
+    def reset(self):
+        self.lateness_histogram = [0] * (len(self.bucket_edges_us) + 1)
+        self.events = 0
+        self.total_lateness_ns = 0
+        self.max_lateness_ns = 0
+        self.loop_lateness_ns = array('q')  # Lateness of each event of the loop that is playing
+        self.last_loop_lateness_ns = array('q')  # Same for the last loop played to the end
+        self.backlog = 0  # Late events in a row (current run)
+        self.max_backlog = 0
+        self._last_deadline_ns = None
+        self.loops = 0
+        self.played_time = 0.0  # Seconds of loops played (and of interrupted loops)
+        self._loop_start_ns = None  # perf_counter_ns at the start of the loop that is playing
+        self.compiles = 0
+        self.compile_total = 0.0  # Seconds
+        self.compile_last = 0.0
+        self.compile_max = 0.0
+
+    def record_event(self, lateness_ns, deadline_ns):
+        """`deadline_ns`: when the event was due (perf_counter_ns), to recognize simultaneous events."""
+        self.events += 1
+        self.total_lateness_ns += lateness_ns
+        if lateness_ns > self.max_lateness_ns:
+            self.max_lateness_ns = lateness_ns
+        self.lateness_histogram[bisect_left(self.bucket_edges_us, lateness_ns // 1000)] += 1
+        if len(self.loop_lateness_ns) < self.max_loop_events:
+            self.loop_lateness_ns.append(lateness_ns)
+
+        if deadline_ns == self._last_deadline_ns:
+            return  # Same timestamp as the previous event: density, not lag
+        self._last_deadline_ns = deadline_ns
+        if lateness_ns > self.backlog_threshold_ns:
+            self.backlog += 1
+            if self.backlog > self.max_backlog:
+                self.max_backlog = self.backlog
+        else:
+            self.backlog = 0
+
+    def start_loop(self, start_ns):
+        """A loop starts (or started) at `start_ns` (perf_counter_ns)."""
+        self._loop_start_ns = start_ns
+
+    def record_loop(self, loop_length):
+        self.loops += 1
+        self.played_time += loop_length
+        self._loop_start_ns = None
+        # Replaced, not modified: snapshot() may be reading the previous one
+        self.last_loop_lateness_ns, self.loop_lateness_ns = self.loop_lateness_ns, array('q')
+
+    def interrupt_loop(self):
+        """
+        The loop that is playing was stopped: the time it played still counts (its events do),
+        its per-event record is dropped and the next loop starts a new one.
+        """
+        if self._loop_start_ns is not None:
+            self.played_time += max(time.perf_counter_ns() - self._loop_start_ns, 0) / 1e9
+            self._loop_start_ns = None
+        self.loop_lateness_ns = array('q')
+
+    def record_compile(self, seconds):
+        self.compiles += 1
+        self.compile_total += seconds
+        self.compile_last = seconds
+        if seconds > self.compile_max:
+            self.compile_max = seconds
+
+    def elapsed(self):
+        """Seconds played, including the part of the current loop that has been played."""
+        loop_start_ns = self._loop_start_ns
+        current = max(time.perf_counter_ns() - loop_start_ns, 0) / 1e9 if loop_start_ns is not None else 0.0
+        return self.played_time + current
+
+    def lateness_percentile_us(self, percentile):
+        """Upper bound (bucket edge, µs) of the given lateness percentile. None without events."""
+        if not self.events:
+            return None
+        threshold = self.events * percentile / 100
+        count = 0
+        for edge, bucket in zip(self.bucket_edges_us + (None,), self.lateness_histogram):
+            count += bucket
+            if count >= threshold:
+                return min(edge, self.max_lateness_ns / 1000) if edge is not None else self.max_lateness_ns / 1000
+        return self.max_lateness_ns / 1000
+
+    def last_loop_lateness_us(self, percentile):
+        """Exact lateness percentile (µs, nearest rank) of the last loop. None without events."""
+        lateness = sorted(self.last_loop_lateness_ns)
+        if not lateness:
+            return None
+        rank = max(math.ceil(len(lateness) * percentile / 100), 1)
+        return lateness[rank - 1] / 1000
+
+    def snapshot(self) -> dict:
+        elapsed = self.elapsed()
+        return {
+            "events": self.events,
+            "loops": self.loops,
+            "events_per_second": self.events / elapsed if elapsed else 0.0,
+            "lateness_mean_us": self.total_lateness_ns / self.events / 1000 if self.events else 0.0,
+            "lateness_p50_us": self.lateness_percentile_us(50),
+            "lateness_p99_us": self.lateness_percentile_us(99),
+            "lateness_max_us": self.max_lateness_ns / 1000,
+            "lateness_histogram_us": {
+                (f"<={edge}" if edge is not None else f">{self.bucket_edges_us[-1]}"): bucket
+                for edge, bucket in zip(self.bucket_edges_us + (None,), self.lateness_histogram)
+            },
+            "last_loop_events": len(self.last_loop_lateness_ns),
+            "last_loop_lateness_p50_us": self.last_loop_lateness_us(50),
+            "last_loop_lateness_p99_us": self.last_loop_lateness_us(99),
+            "last_loop_lateness_max_us": self.last_loop_lateness_us(100),
+            "max_backlog": self.max_backlog,
+            "compile_ms_last": self.compile_last * 1000,
+            "compile_ms_mean": self.compile_total / self.compiles * 1000 if self.compiles else 0.0,
+            "compile_ms_max": self.compile_max * 1000,
+        }
+
+    def summary(self) -> str:
+        """One line for the UI."""
+        stats = self.snapshot()
+        p99 = stats["lateness_p99_us"]
+        return (
+            f"Late p99 {p99 / 1000:.1f}ms max {stats['lateness_max_us'] / 1000:.1f}ms | "
+            f"{stats['events_per_second']:.0f} ev/s | backlog {stats['max_backlog']} | "
+            f"compile {stats['compile_ms_last']:.1f}ms"
+        ) if p99 is not None else "No events yet"
+
+    def dump(self, path):
+        """Write snapshot() to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(dict(self.snapshot(), written=time.strftime("%Y-%m-%d %H:%M:%S")), f, indent=2)
@@ -1,48 +1,89 @@
 # playback_thread.py
 from PySide6.QtCore import QThread
+from event_buffer import EventBuffer
+from project import compile_project, compile_row, next_boundary
 
 
 class PlaybackThread(QThread):
     """
     Generates one loop of arpeggios for all rows and plays them.
+
+    Loops are compiled from the latest immutable project snapshot (see project.Project),
+    published by the GUI thread. This thread never reads the widgets.
+    Edits made while playing are spliced into the running loop at the next quantization
+    boundary (see poll_edits), instead of waiting for the end of the loop.
+
+    In pipelined mode (default) the next loop is compiled on a background worker while
+    the current loop plays, so it is ready the moment the loop boundary is reached.
     """
-    def __init__(self, instrument_rows, get_bpm_func, synth, parent=None):
+    def __init__(self, get_snapshot, synth, parent=None, pipelined=True, quantize=None):
         super().__init__(parent)
-        self.instrument_rows = instrument_rows  # list[InstrumentRowWidget]
-        self.get_bpm_func = get_bpm_func  # function that returns current BPM
+        self.get_snapshot = get_snapshot  # function that returns the current project.Project
+        self.quantize = quantize  # None: splice edits at the next block start, else every `quantize` beats
+        # Snapshot the playing loop is known to reflect: set by start_loop to the snapshot the loop
+        # was compiled from, then moved by poll_edits (the splice path). Loops compiled on the
+        # background worker do not move it, they may be compiled before an edit was spliced.
+        self._spliced = None
+        self._restructured = False  # BPM or row count changed: nothing is spliced until the next loop
         self.synth = synth
+        self.pipelined = pipelined
         self.running = False
 
-    def run(self):
-        self.running = True
+    def compile_loop(self):
+        """
+        Build one track (EventBuffer) for each row. Returns (tracks, loop_length, snapshot).
+        """
+        # Tracks use delta times! (seconds since the last event)
+        # E.g. time:  [0,       0,              0,        1.0,       ...]
+        #      type:  [MARKER,  PROGRAM_CHANGE, NOTE_ON,  NOTE_OFF,  ...]
+        #      data1: [row,     program,        note,     note,      ...]
+        snapshot = self.get_snapshot()
+        tracks, loop_length = compile_project(snapshot, markers=True)
+        return tracks, loop_length, snapshot
+
+    def start_loop(self, loop):
+        """Called by the engine right before `loop` (see compile_loop) plays."""
+        self._spliced = loop[2]
+        self._restructured = False
 
-        while self.running:
-            bpm = self.get_bpm_func()
-
-            # Build one MIDI track [mido.Messages] for each row
-            midi_tracks = []
-            for row_index, row in enumerate(self.instrument_rows):
-                if row.mute_checkbox.isChecked():
-                    # Mute => empty track
-                    midi_tracks.append([])
-                else:
-                    # MIDO track uses delta times! (seconds since the last event)
-                    # E.g. [Message('program_change', program=..., time=0),
-                    #       Message('note_on', note=..., velocity=..., time=0),
-                    #       Message('note_off', note=..., velocity=..., time=1.0),
-                    #       ... ]
-                    track, play_time = row.get_all_arpeggios(bpm)
-
-                    midi_tracks.append(track)
-
-            # Play MIDI
-            if self.running:
-                self.synth.play_midi(midi_tracks)
+    def poll_edits(self, now, loop_length):
+        """
+        Recompile only the rows that changed since the last splice (unchanged blocks come
+        from the arpeggio cache). Returns the (swap_time, channel, track) splices for the engine.
+        A row that is already up to date in the playing loop may be spliced again, which is harmless.
+        """
+        snapshot, previous = self.get_snapshot(), self._spliced
+        if snapshot is previous or self._restructured:
+            return []
+        if snapshot.bpm != previous.bpm or len(snapshot.rows) != len(previous.rows):
+            # Changes the whole loop: heard from the next loop on. Later edits are not compared
+            # to this snapshot, the playing loop still has the old BPM and rows.
+            self._restructured = True
+            return []
+        self._spliced = snapshot
 
+        swaps = []
+        for channel, (row, previous_row) in enumerate(zip(snapshot.rows, previous.rows)):
+            if row == previous_row:
+                continue
+            swap_time = next_boundary(row, snapshot.bpm, now, self.quantize)
+            if swap_time is None or swap_time >= loop_length:
+                continue  # Heard from the next loop on
+            track = EventBuffer() if row.mute else compile_row(row, channel, snapshot.bpm, markers=True)
+            swaps.append((swap_time, channel, track))
+        return swaps
+
+    def notify_edit(self):
+        """Called by the GUI thread after publishing a new snapshot."""
+        self.synth.engine.notify_edit()
+
+    def run(self):
+        self.running = True
+        self.synth.engine.run(self.compile_loop, pipelined=self.pipelined, poll_edits=self.poll_edits,
+                              start_loop=self.start_loop)
         self.running = False
         self.finished.emit()
 
     def stop(self):
         self.running = False
-        self.synth.interrupt()
-        self.synth.stop_all_sounds()
+        self.synth.engine.stop()
@@ -0,0 +1,25 @@
+# playhead.py
+from array import array
+
+
+class Playhead:
+    """
+    Current playback position, shared between the playback thread and the GUI.
+
+    The playback thread writes the block index of a row into `blocks` whenever a MARKER event
+    is dispatched (see EventDispatcher.dispatch: a single int store, no Qt call and no string
+    formatting). The GUI reads the slots from a frame-rate timer and repaints only the rows
+    whose block changed, however many markers were dispatched in between.
+    """
+    __slots__ = ("blocks",)
+
+    def __init__(self, rows=16):
+        self.blocks = array('i', [-1]) * rows  # row -> index of the block playing, -1 = none
+
+    def clear(self):
+        for row in range(len(self.blocks)):
+            self.blocks[row] = -1
+
+    def read(self):
+        """Copy of all slots (row -> block index) for the reader."""
+        return self.blocks.tolist()
@@ -0,0 +1,193 @@
+# project.py
+"""
+Qt-free project model and access to project files (the JSON format written by save_load.py,
+or the binary format of project_binary.py for files ending in .loop).
+
+A Project is an immutable snapshot of everything playback needs. The GUI publishes a new one
+on every edit (LoopArpeggiatorMainWindow.publish_snapshot) and the playback thread only reads
+snapshots. Project files load into the same structure for headless playback and rendering.
+"""
+import json
+import math
+from typing import NamedTuple
+from arp import ArpParams, Mode
+from arp_cache import arpeggio_cache
+from event_buffer import EventBuffer, MARKER
+
+
+class ProjectRow(NamedTuple):
+    mute: bool
+    volume: int
+    instrument: int
+    bank: int
+    blocks: tuple  # tuple[ArpParams], played one after the other
+    block_ids: tuple = ()  # Stable ids of the GUI blocks (cache owners), empty for project files
+
+
+class Project(NamedTuple):
+    bpm: int
+    rows: tuple  # tuple[ProjectRow], row index = MIDI channel
+
+
+def arpeggiator_to_dict(arp) -> dict:
+    """Serialize an Arpeggiator or ArpParams (one block of a project file)."""
+    return {
+        "rate": arp.rate,
+        "note_length": arp.note_length,
+        "ground_note": arp.ground_note,
+        "mute_ground_note": arp.mute_ground_note,
+        "mode": arp.mode.name if arp.mode else None,
+        "mute": arp.mute,
+        "velocity": arp.velocity,
+        "variants_active": list(arp.variants_active),
+        "variants": list(arp.variants),
+        "chords_active": list(arp.chords_active),
+        "vibrato": arp.vibrato,
+        "reverb": arp.reverb,
+        "chorus": arp.chorus
+    }
+
+
+def params_from_dict(block_data: dict) -> ArpParams:
+    """Inverse of arpeggiator_to_dict, with the same defaults as save_load.load_project."""
+    return ArpParams(
+        rate=block_data.get("rate", 1.0),
+        note_length=block_data.get("note_length", 0.2),
+        ground_note=block_data.get("ground_note", 60),
+        mute_ground_note=block_data.get("mute_ground_note", False),
+        mode=Mode[block_data.get("mode")] if block_data.get("mode") in Mode.__members__ else None,
+        velocity=block_data.get("velocity", 100),
+        variants_active=tuple(block_data.get("variants_active", [False, False, False])),
+        chords_active=tuple(block_data.get("chords_active", [False, False, False])),
+        variants=tuple(block_data.get("variants", [0, 0, 0])),
+        mute=block_data.get("mute", False),
+        vibrato=block_data.get("vibrato", False),
+        reverb=block_data.get("reverb", False),
+        chorus=block_data.get("chorus", False),
+    )
+
+
+def project_from_data(data: dict, max_rows=16) -> Project:
+    rows = []
+    for row_data in data.get("instruments", [])[:max_rows]:
+        volume = row_data.get("volume", 64)
+        # Like InstrumentRowContainer.update_arp_volumes after loading: the row volume wins
+        blocks = tuple(params_from_dict(block_data)._replace(velocity=volume) for block_data in row_data.get("arpeggiators", []))
+        rows.append(ProjectRow(
+            mute=row_data.get("mute", False),
+            volume=volume,
+            instrument=row_data.get("instrument", 0),
+            bank=row_data.get("bank", 0),
+            blocks=blocks,
+        ))
+    return Project(bpm=data.get("bpm", 60), rows=tuple(rows))
+
+
+def project_to_data(project: Project) -> dict:
+    return {
+        "bpm": project.bpm,
+        "instruments": [
+            {
+                "mute": row.mute,
+                "volume": row.volume,
+                "instrument": row.instrument,
+                "bank": row.bank,
+                "arpeggiators": [arpeggiator_to_dict(params) for params in row.blocks]
+            }
+            for row in project.rows
+        ]
+    }
+
+
+BINARY_EXTENSION = ".loop"  # See project_binary.py, every other file is JSON
+
+
+def row_indices(rows, count):
+    """
+    The indices of the rows to read out of `count` rows: all of them if `rows` is None.
+    Same check for every format: negative or too large indices raise IndexError.
+    """
+    if rows is None:
+        return range(count)
+    rows = list(rows)
+    for i in rows:
+        if not 0 <= i < count:
+            raise IndexError(f"Row index {i} out of range, the project has {count} rows")
+    return rows
+
+
+def read_project(filename, max_rows=16, rows=None) -> Project:
+    """`rows`: indices of the rows to read, e.g. [2] to render a single row (default: all)."""
+    if filename.endswith(BINARY_EXTENSION):
+        from project_binary import read_binary
+        return read_binary(filename, max_rows=max_rows, rows=rows)  # Only decodes the rows read
+    with open(filename, "r") as f:
+        project = project_from_data(json.load(f), max_rows=max_rows)
+    if rows is not None:
+        project = project._replace(rows=tuple(project.rows[i] for i in row_indices(rows, len(project.rows))))
+    return project
+
+
+def write_project(filename, project: Project):
+    if filename.endswith(BINARY_EXTENSION):
+        from project_binary import write_binary
+        write_binary(filename, project)
+        return
+    with open(filename, "w") as f:
+        json.dump(project_to_data(project), f, indent=2)
+
+
+def row_play_time(row: ProjectRow, bpm) -> float:
+    """Same as InstrumentRowContainer.get_play_time"""
+    return sum((1 / params.rate) * (60 / bpm) for params in row.blocks)
+
+
+def block_starts(row: ProjectRow, bpm) -> list:
+    """Start time (seconds into the loop) of every block of the row."""
+    starts = []
+    time = 0.0
+    for params in row.blocks:
+        starts.append(time)
+        time += (1 / params.rate) * (60 / bpm)
+    return starts
+
+
+def next_boundary(row: ProjectRow, bpm, after, quantize=None):
+    """
+    First quantization boundary at or after `after` (seconds into the loop), where an edit of
+    `row` can be spliced in. `quantize` is None for block starts, else a grid of `quantize` beats.
+    Returns None if the row has no boundary left in this loop.
+    """
+    if quantize is None:
+        return next((start for start in block_starts(row, bpm) if start >= after), None)
+    grid = quantize * 60 / bpm
+    return math.ceil(after / grid) * grid
+
+
+def compile_row(row: ProjectRow, channel, bpm, markers=False) -> EventBuffer:
+    """
+    One loop of a row as a track: the arpeggios of its blocks one after the other.
+    With `markers`, every block starts with a MARKER event for the UI.
+    Program and effect changes that repeat the previous block's values are left out.
+    """
+    track = EventBuffer()
+    state = {}  # (type, data1) -> data2 in effect at the end of the previous block
+    owners = row.block_ids or (None,) * len(row.blocks)
+    for index, (params, owner) in enumerate(zip(row.blocks, owners)):
+        notes, _ = arpeggio_cache.get_arpeggio(owner, params, bpm, row.instrument)
+        if markers:
+            track.append(0, MARKER, channel, index)
+        track.extend_with_state(notes, state)
+    track.set_channel(channel)
+    return track
+
+
+def compile_project(project: Project, markers=False):
+    """One loop of the whole project. Returns (tracks, loop_length)."""
+    tracks = []
+    loop_length = 0
+    for channel, row in enumerate(project.rows):
+        # Muted rows still count for the loop length
+        loop_length = max(loop_length, row_play_time(row, project.bpm))
+        tracks.append(EventBuffer() if row.mute else compile_row(row, channel, project.bpm, markers))
+    return tracks, loop_length
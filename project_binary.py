@@ -0,0 +1,274 @@
+# project_binary.py
+"""
+Compact binary project format (.loop), next to the JSON format of save_load.py.
+
+    python project_binary.py saves/save_bank.json saves/save_bank.loop    # convert (either way)
+
+Layout (little-endian):
+  - header:       magic, version, row count, bpm, number of distinct blocks
+  - row index:    one ROW_DTYPE record per row (mute, volume, instrument, bank, block count, offset)
+  - block table:  every distinct block (ArpParams) once, as columns (rate, note_length, flags, ...)
+  - row sections: per row, the index of each of its blocks in the block table (uint32)
+
+Files are read through mmap: the header and the row index are parsed when the file is opened,
+the blocks of a row only when it is read (BinaryProject.read_row), so a single row can be loaded
+without decoding the rest of the file. Even then the ArpParams of a row are only built when its
+blocks are first used (see RowBlocks).
+"""
+import argparse
+import mmap
+import struct
+from collections.abc import Sequence
+import numpy as np
+
+from arp import ArpParams, Mode
+from project import Project, ProjectRow, row_indices
+
+MAGIC = b"LOOPEGG\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHdI")  # magic, version, rows, bpm, distinct blocks
+
+ROW_DTYPE = np.dtype([
+    ("mute", "?"),
+    ("volume", "u1"),
+    ("instrument", "<u2"),
+    ("bank", "<u2"),
+    ("blocks", "<u4"),
+    ("offset", "<u8"),  # File offset of the row's block indices
+])
+
+# Block table columns, in file order (8-byte columns first, so every column stays aligned)
+COLUMNS = (
+    ("rate", "<f8", 1),
+    ("note_length", "<f8", 1),
+    ("flags", "<u2", 1),
+    ("ground_note", "u1", 1),
+    ("velocity", "u1", 1),
+    ("mode", "u1", 1),  # 0 = no mode, else Mode.value + 1 (like batch_compile)
+    ("variants", "i1", 3),
+)
+BLOCK_SIZE = sum(np.dtype(dtype).itemsize * width for _, dtype, width in COLUMNS)
+
+# Bits of the flags column
+FLAGS = ("mute_ground_note", "mute", "vibrato", "reverb", "chorus")
+VARIANTS_ACTIVE_BIT = len(FLAGS)  # 3 bits
+CHORDS_ACTIVE_BIT = VARIANTS_ACTIVE_BIT + 3  # 3 bits
+FLAG_BITS = CHORDS_ACTIVE_BIT + 3
+
+MODES = (None, Mode.UP, Mode.DOWN, Mode.RANDOM)
+
+
+def _align(offset, alignment):
+    return -(-offset // alignment) * alignment
+
+
+def write_binary(filename, project: Project):
+    # Distinct blocks (ArpParams are interned and hashable), in order of first use
+    table = {}
+    row_indices = []
+    for row in project.rows:
+        indices = [table.setdefault(params, len(table)) for params in row.blocks]
+        row_indices.append(np.array(indices, dtype="<u4"))
+    blocks = list(table)
+
+    rows = np.zeros(len(project.rows), dtype=ROW_DTYPE)
+    table_offset = _align(HEADER.size + rows.nbytes, 8)
+    offset = _align(table_offset + BLOCK_SIZE * len(blocks), 4)
+    for i, (row, indices) in enumerate(zip(project.rows, row_indices)):
+        rows[i] = (row.mute, row.volume, row.instrument, row.bank, len(indices), offset)
+        offset += indices.nbytes
+
+    with open(filename, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(project.rows), project.bpm, len(blocks)))
+        f.write(rows.tobytes())
+        f.write(bytes(table_offset - f.tell()))
+        for column in _encode_blocks(blocks):
+            f.write(column.tobytes())
+        f.write(bytes(_align(f.tell(), 4) - f.tell()))
+        for indices in row_indices:
+            f.write(indices.tobytes())
+
+
+def _encode_blocks(blocks):
+    """The block table columns (see COLUMNS) of `blocks` (ArpParams)."""
+    count = len(blocks)
+    if not count:
+        return [np.zeros(0, dtype=dtype) for _, dtype, _ in COLUMNS]
+    (rate, note_length, ground_note, mute_ground_note, mode, velocity,
+     variants_active, chords_active, variants, mute, vibrato, reverb, chorus) = zip(*[block._values for block in blocks])
+
+    bits = np.zeros((count, FLAG_BITS), dtype=np.uint16)
+    for bit, values in enumerate((mute_ground_note, mute, vibrato, reverb, chorus)):
+        bits[:, bit] = values
+    bits[:, VARIANTS_ACTIVE_BIT:VARIANTS_ACTIVE_BIT + 3] = variants_active
+    bits[:, CHORDS_ACTIVE_BIT:CHORDS_ACTIVE_BIT + 3] = chords_active
+    flags = (bits << np.arange(FLAG_BITS, dtype=np.uint16)).sum(axis=1, dtype=np.uint16)
+
+    return [
+        np.array(rate, dtype="<f8"),
+        np.array(note_length, dtype="<f8"),
+        flags.astype("<u2"),
+        np.array(ground_note, dtype="u1"),
+        np.array(velocity, dtype="u1"),
+        np.array([0 if m is None else m.value + 1 for m in mode], dtype="u1"),
+        np.array(variants, dtype="i1").reshape(-1),
+    ]
+
+
+class BinaryProject:
+    """
+    An open .loop file. Only the header and the row index are parsed on open;
+    read_row() copies the block table entries of one row, whose ArpParams are only built
+    when the blocks are first used (see RowBlocks).
+    """
+    def __init__(self, filename):
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._map) < HEADER.size:
+                raise ValueError(f"Truncated binary project: {filename}")
+            magic, version, row_count, bpm, block_count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a Loopeggiator binary project (version {VERSION}): {filename}")
+
+            # Checked before any view is made: the map cannot be closed while a view of it exists
+            offset = _align(HEADER.size + ROW_DTYPE.itemsize * row_count, 8)
+            if len(self._map) < offset + BLOCK_SIZE * block_count:
+                raise ValueError(f"Truncated binary project: {filename}")
+
+            self.bpm = int(bpm) if bpm.is_integer() else bpm
+            self.rows = np.frombuffer(self._map, dtype=ROW_DTYPE, count=row_count, offset=HEADER.size)
+            if row_count and int((self.rows["offset"] + 4 * self.rows["blocks"].astype("u8")).max()) > len(self._map):
+                raise ValueError(f"Truncated binary project: {filename}")
+            self._columns = {}
+            for name, dtype, width in COLUMNS:
+                column = np.frombuffer(self._map, dtype=dtype, count=block_count * width, offset=offset)
+                self._columns[name] = column.reshape(-1, width) if width > 1 else column
+                offset += column.nbytes
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_row(self, index) -> ProjectRow:
+        mute, volume, instrument, bank, count, offset = self.rows[index].tolist()
+        indices = np.frombuffer(self._map, dtype="<u4", count=count, offset=offset)
+        return ProjectRow(
+            mute=mute,
+            volume=volume,
+            instrument=instrument,
+            bank=bank,
+            blocks=RowBlocks({name: column[indices] for name, column in self._columns.items()}),
+        )
+
+    def read(self, max_rows=16, rows=None) -> Project:
+        """`rows`: indices of the rows to read (default: the first max_rows)."""
+        rows = row_indices(rows, min(len(self), max_rows))
+        return Project(bpm=self.bpm, rows=tuple(self.read_row(i) for i in rows))
+
+    def close(self):
+        # The NumPy views have to go before the map can be closed
+        self.rows = None
+        self._columns = {}
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class RowBlocks(Sequence):
+    """
+    The blocks (ArpParams) of a row read from a binary project, decoded on first access.
+    Holds a copy of the row's block table columns, so it outlives the BinaryProject.
+    Compares and hashes like the tuple of its blocks, and pickles as that tuple.
+    """
+    __slots__ = ("_columns", "_blocks")
+
+    def __init__(self, columns):
+        self._columns = columns  # Block table columns (see COLUMNS), one entry per block of the row
+        self._blocks = None
+
+    def _decoded(self):
+        blocks = self._blocks
+        if blocks is None:
+            blocks = self._blocks = _decode_blocks(self._columns)
+        return blocks
+
+    def __len__(self):
+        return len(self._columns["rate"])
+
+    def __getitem__(self, index):
+        return self._decoded()[index]
+
+    def __iter__(self):
+        return iter(self._decoded())
+
+    def __eq__(self, other):
+        if isinstance(other, (tuple, RowBlocks)):
+            return self._decoded() == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._decoded())
+
+    def __repr__(self):
+        return repr(self._decoded())
+
+    def __reduce__(self):
+        return (tuple, (self._decoded(),))
+
+
+def _decode_blocks(c):
+    """Block table columns (see COLUMNS) to a tuple of ArpParams."""
+    bits = ((c["flags"][:, None] >> np.arange(FLAG_BITS, dtype=np.uint16)) & 1).astype(bool).tolist()
+    intern = ArpParams._intern  # tolist() already gives the normalized types
+    return tuple([
+        intern((
+            rate, note_length, ground_note,
+            flags[0],  # mute_ground_note
+            MODES[mode], velocity,
+            tuple(flags[VARIANTS_ACTIVE_BIT:VARIANTS_ACTIVE_BIT + 3]),
+            tuple(flags[CHORDS_ACTIVE_BIT:CHORDS_ACTIVE_BIT + 3]),
+            tuple(variants),
+            flags[1], flags[2], flags[3], flags[4],  # mute, vibrato, reverb, chorus
+        ))
+        for rate, note_length, ground_note, velocity, mode, variants, flags in zip(
+            c["rate"].tolist(),
+            c["note_length"].tolist(),
+            c["ground_note"].tolist(),
+            c["velocity"].tolist(),
+            c["mode"].tolist(),
+            c["variants"].tolist(),
+            bits,
+        )
+    ])
+
+
+def read_binary(filename, max_rows=16, rows=None) -> Project:
+    with BinaryProject(filename) as project:
+        return project.read(max_rows, rows=rows)
+
+
+def main():
+    from project import read_project, write_project
+
+    parser = argparse.ArgumentParser(description="Convert a project between the JSON and the binary (.loop) format.")
+    parser.add_argument("input", help="Project file to read (.json or .loop).")
+    parser.add_argument("output", help="Project file to write (.json or .loop).")
+    args = parser.parse_args()
+
+    project = read_project(args.input)
+    write_project(args.output, project)
+    print(f"Wrote {len(project.rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# project_generator.py
+"""
+Generates synthetic projects in the save_load.py format, for stress tests and benchmarks.
+
+    python project_generator.py saves/stress.json --rows 16 --blocks 2000 --seed 1
+    python project_generator.py saves/random.json --rows 8 --blocks 100 --rates 0.5 1 2 --random-mode 0.3
+
+The same arguments and seed always produce the same file.
+"""
+import argparse
+import random
+
+from arp import ArpParams, Mode
+from project import Project, ProjectRow, write_project
+
+RATE_VALUES = [0.125, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0]  # Same as the rate slider of ArpeggiatorWidget
+
+
+def generate_project(
+    rows=4,
+    blocks=16,
+    bpm=120,
+    seed=0,
+    variant_density=0.5,
+    rates=(1.0,),
+    random_mode=0.0,
+    mute_density=0.0,
+    effect_density=0.2,
+    max_rows=16,
+) -> Project:
+    """
+    A reproducible random project.
+      - rows, blocks:    number of rows (at most max_rows) and blocks per row
+      - variant_density: probability for each of the 3 variants of a block to be active
+      - rates:           rates to choose from (uniformly), e.g. (0.5, 1, 2)
+      - random_mode:     fraction of blocks in Mode.RANDOM (reshuffled every loop, never cached)
+      - mute_density:    fraction of muted blocks
+      - effect_density:  probability of vibrato, reverb and chorus (each)
+    """
+    rng = random.Random(seed)
+    other_modes = [Mode.UP, Mode.DOWN, None]
+
+    project_rows = []
+    for _ in range(min(rows, max_rows)):
+        volume = rng.randrange(40, 110)
+        row_blocks = []
+        for _ in range(blocks):
+            mode = Mode.RANDOM if rng.random() < random_mode else rng.choice(other_modes)
+            row_blocks.append(ArpParams(
+                rate=float(rng.choice(rates)),
+                note_length=rng.randrange(1, 11) / 10,  # Steps of the note length slider
+                ground_note=rng.randrange(36, 84),
+                mute_ground_note=rng.random() < 0.05,
+                mode=mode,
+                velocity=volume,  # Blocks use the row volume
+                variants_active=tuple(rng.random() < variant_density for _ in range(3)),
+                chords_active=(False, False, False),
+                variants=tuple(rng.randrange(-25, 25) for _ in range(3)),  # -25 = silence
+                mute=rng.random() < mute_density,
+                vibrato=rng.random() < effect_density,
+                reverb=rng.random() < effect_density,
+                chorus=rng.random() < effect_density,
+            ))
+        project_rows.append(ProjectRow(
+            mute=False,
+            volume=volume,
+            instrument=rng.randrange(128),
+            bank=0,
+            blocks=tuple(row_blocks),
+        ))
+    return Project(bpm=bpm, rows=tuple(project_rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Loopeggiator project.")
+    parser.add_argument("output", help="Project file (.json or .loop) to write.")
+    parser.add_argument("-r", "--rows", type=int, default=4, help="Number of instrument rows (max 16).")
+    parser.add_argument("-b", "--blocks", type=int, default=16, help="Blocks per row.")
+    parser.add_argument("--bpm", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same project).")
+    parser.add_argument("--variant-density", type=float, default=0.5, help="Probability of each variant being active.")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1.0], choices=RATE_VALUES, help="Rates to choose from.")
+    parser.add_argument("--random-mode", type=float, default=0.0, help="Fraction of blocks in random mode.")
+    parser.add_argument("--mute-density", type=float, default=0.0, help="Fraction of muted blocks.")
+    parser.add_argument("--effect-density", type=float, default=0.2, help="Probability of each effect (vibrato, reverb, chorus).")
+    args = parser.parse_args()
+
+    project = generate_project(
+        rows=args.rows,
+        blocks=args.blocks,
+        bpm=args.bpm,
+        seed=args.seed,
+        variant_density=args.variant_density,
+        rates=args.rates,
+        random_mode=args.random_mode,
+        mute_density=args.mute_density,
+        effect_density=args.effect_density,
+    )
+    write_project(args.output, project)
+    print(f"Wrote {len(project.rows)} rows x {args.blocks} blocks to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,24 @@
 import json
 import os
 from PySide6.QtWidgets import QFileDialog
-from arp import Mode
+from project import arpeggiator_to_dict, read_project, write_project, compile_project, BINARY_EXTENSION
+from midi_export import tracks_to_midi_file
+
+PROJECT_FILTER = f"Projects (*.json *{BINARY_EXTENSION});;JSON Files (*.json);;Binary Projects (*{BINARY_EXTENSION})"
 
 def save_project(main_window, filename=None):
     if not filename:
         save_dir = os.path.join(os.path.dirname(__file__), "saves")
         os.makedirs(save_dir, exist_ok=True)
-        filename, _ = QFileDialog.getSaveFileName(main_window, "Save Project", save_dir, "JSON Files (*.json)")
+        filename, _ = QFileDialog.getSaveFileName(main_window, "Save Project", save_dir, PROJECT_FILTER)
         if not filename:
             return
 
+    if filename.endswith(BINARY_EXTENSION):
+        main_window.publish_snapshot()  # Up to date with the widgets
+        write_project(filename, main_window.snapshot)
+        return
+
     if not filename.endswith(".json"):
         filename += ".json"
 
@@ -30,23 +38,7 @@ def save_project(main_window, filename=None):
         }
 
         for block in row.arp_blocks:
-            arp = block.arp_widget.arp
-            block_data = {
-                "rate": arp.rate,
-                "note_length": arp.note_length,
-                "ground_note": arp.ground_note,
-                "mute_ground_note": arp.mute_ground_note,
-                "mode": arp.mode.name if arp.mode else None,
-                "mute": arp.mute,
-                "velocity": arp.velocity,
-                "variants_active": arp.variants_active,
-                "variants": arp.variants,
-                "chords_active": arp.chords_active,
-                "vibrato": arp.vibrato,
-                "reverb": arp.reverb,
-                "chorus": arp.chorus
-            }
-            row_data["arpeggiators"].append(block_data)
+            row_data["arpeggiators"].append(arpeggiator_to_dict(block.arp))
 
         data["instruments"].append(row_data)
 
@@ -57,7 +49,7 @@ def load_project(main_window, filename=None):
     if not filename:
         save_dir = os.path.join(os.path.dirname(__file__), "saves")
         os.makedirs(save_dir, exist_ok=True)
-        filename, _ = QFileDialog.getOpenFileName(main_window, "Load Project", save_dir, "JSON Files (*.json)")
+        filename, _ = QFileDialog.getOpenFileName(main_window, "Load Project", save_dir, PROJECT_FILTER)
         if not filename:
             return
 
@@ -65,68 +57,45 @@ def load_project(main_window, filename=None):
         print(f"Project file not found: {filename}")
         return
 
-    with open(filename, "r") as f:
-        data = json.load(f)
-
-    main_window.top_bar.bpm = data.get("bpm", 60)
-
-    for row in list(main_window.instrument_rows):
-        main_window.del_instrument(row)
-
-    for i, row_data in enumerate(data.get("instruments", [])):
-        row = main_window.add_instrument()
-        if row is None:
-            print(f"Failed to add instrument row {i}.")
-            continue
-
-        row.mute_checkbox.setChecked(row_data.get("mute", False))
-        row.settings_panel.volume_slider.setValue(row_data.get("volume", 64))
-
-        target_program = row_data.get("instrument", 0)
-        target_bank = row_data.get("bank", 0)
-
-        # Find the index of the first preset with this program number
-        preset_index = next(
-            (i for i in range(row.settings_panel.instrument_combo.count())
-            if row.settings_panel.instrument_combo.itemData(i).get("program") == target_program
-            and row.settings_panel.instrument_combo.itemData(i).get("bank", 0) == target_bank),
-            0
-        )
+    # Model first (no widgets involved), then the widgets of every row in one go each
+    project = read_project(filename, max_rows=main_window.synth.max_rows)
+    preset_index = main_window.synth.preset_index
 
-        row.settings_panel.instrument_combo.setCurrentIndex(preset_index)
+    main_window.setUpdatesEnabled(False)
+    try:
+        main_window.top_bar.bpm = project.bpm
 
-        if row.arp_blocks:
-            row.remove_arp_block(row.arp_blocks[0])
+        for row in list(main_window.instrument_rows):
+            main_window.del_instrument(row)
 
-        for block_data in row_data.get("arpeggiators", []):
-            row.arp_panel.add_block(
-                mute=block_data.get("mute", False),
-                rate=block_data.get("rate", 1.0),
-                note_length=block_data.get("note_length", 0.2),
-                ground_note=block_data.get("ground_note", 60),
-                mute_ground_note=block_data.get("mute_ground_note", False),
-                mode=Mode[block_data.get("mode")] if block_data.get("mode") in Mode.__members__ else None,
-                variants_active=block_data.get("variants_active", [False, False, False]),
-                variants=block_data.get("variants", [0, 0, 0]),
-                chords_active=block_data.get("chords_active", [False, False, False]),
-            )
+        for i, row_model in enumerate(project.rows):
+            row = main_window.add_instrument()
+            if row is None:
+                print(f"Failed to add instrument row {i}.")
+                continue
+            # First preset with this bank and program, like the combo box order
+            row.load(row_model, preset_index.get((row_model.bank, row_model.instrument), 0))
+    finally:
+        main_window.setUpdatesEnabled(True)
 
-            block = row.arp_blocks[-1]
-            arp = block.arp_widget.arp
+    main_window.update_layout()  # One loop length and block width pass for the whole project
 
-            arp.vibrato = block_data.get("vibrato", False)
-            block.arp_widget.vibrato_checkbox.setChecked(arp.vibrato)
-
-            arp.reverb = block_data.get("reverb", False)
-            block.arp_widget.reverb_checkbox.setChecked(arp.reverb)
-
-            arp.chorus = block_data.get("chorus", False)
-            block.arp_widget.chorus_checkbox.setChecked(arp.chorus)
-
-            arp.velocity = block_data.get("velocity", 100)
-            row.update_arp_volumes()
+def export_midi(main_window, filename=None, repetitions=1):
+    """Export the compiled loop (repeated `repetitions` times) as a type-1 MIDI file."""
+    if not filename:
+        save_dir = os.path.join(os.path.dirname(__file__), "saves")
+        os.makedirs(save_dir, exist_ok=True)
+        filename, _ = QFileDialog.getSaveFileName(main_window, "Export MIDI", save_dir, "MIDI Files (*.mid)")
+        if not filename:
+            return
 
-            block.arp_widget.set_variants(arp.variants_active, arp.variants)
-            block.arp_widget.update_chord_button_states()
+    if not filename.endswith(".mid"):
+        filename += ".mid"
 
-    main_window.update_loop_length()
+    # Same compile path as playback, from a snapshot up to date with the widgets
+    main_window.publish_snapshot()
+    project = main_window.snapshot
+    tracks, loop_length = compile_project(project)
+    banks = [row.bank for row in project.rows]
+    midi_file = tracks_to_midi_file(tracks, project.bpm, loop_length, repetitions=repetitions, banks=banks)
+    midi_file.save(filename)
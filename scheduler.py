@@ -0,0 +1,80 @@
+# scheduler.py
+import threading
+import time
+from playback_stats import PlaybackStats
+
+
+class Scheduler:
+    """
+    Monotonic event scheduler used by SynthPlayer.play_midi.
+
+    - Every deadline is computed from one session epoch (time.perf_counter_ns) plus the
+      start offset of the current loop, so timing errors never accumulate across loops.
+    - Waiting is hybrid: sleep until shortly before the deadline, then spin the rest of the way.
+    - Every dispatched event records its lateness (dispatch time - deadline, in ns) into
+      `stats` (see PlaybackStats), which outlives sessions and keeps the last loop event by event.
+    """
+    spin_window_ns = 2_000_000  # The last 2 ms before a deadline are spun instead of slept
+
+    def __init__(self):
+        self.epoch_ns = None  # Session start, set by the first loop
+        self.loop_start_ns = 0  # Offset of the current loop relative to the epoch
+        self._wake = threading.Event()  # Set by interrupt() to cut a sleep short
+        self.stats = PlaybackStats(backlog_threshold_ns=self.spin_window_ns)
+
+    def reset(self):
+        """End the session. The next loop starts a new epoch."""
+        self.epoch_ns = None
+        self.loop_start_ns = 0
+        self.stats.interrupt_loop()
+        self._wake.clear()
+
+    def interrupt(self):
+        """Wake up a waiting wait_until() immediately."""
+        self._wake.set()
+
+    def rearm(self):
+        """Clear a wake-up after it has been handled, so the next wait sleeps again."""
+        self._wake.clear()
+
+    def begin_loop(self):
+        if self.epoch_ns is None:
+            self.epoch_ns = time.perf_counter_ns()
+            self.loop_start_ns = 0
+        self.stats.start_loop(self.epoch_ns + self.loop_start_ns)
+
+    def end_loop(self, loop_length):
+        """Move the loop origin forward by `loop_length` seconds."""
+        self.loop_start_ns += round(loop_length * 1e9)
+        self.stats.record_loop(loop_length)
+
+    def loop_time(self):
+        """Seconds since the start of the current loop."""
+        return (time.perf_counter_ns() - self.epoch_ns - self.loop_start_ns) / 1e9
+
+    def deadline_ns(self, event_time):
+        """Absolute perf_counter_ns deadline of an event `event_time` seconds into the current loop."""
+        return self.epoch_ns + self.loop_start_ns + round(event_time * 1e9)
+
+    def wait_until(self, event_time, record=True):
+        """
+        Block until `event_time` (seconds since the start of the current loop).
+        Returns the lateness in ns (0 if woken exactly on time), or None if interrupted.
+        With `record=False` the lateness is not added to the loop's statistics.
+        """
+        deadline = self.deadline_ns(event_time)
+
+        remaining = deadline - time.perf_counter_ns()
+        if remaining > self.spin_window_ns:
+            if self._wake.wait((remaining - self.spin_window_ns) / 1e9):
+                return None
+
+        while time.perf_counter_ns() < deadline:
+            if self._wake.is_set():
+                return None
+            time.sleep(0)  # Release the GIL while spinning
+
+        lateness = time.perf_counter_ns() - deadline
+        if record:
+            self.stats.record_event(lateness, deadline)
+        return lateness
@@ -0,0 +1,145 @@
+# synth_backend.py
+"""
+Synth backends: everything playback sends to a synthesizer goes through one of these.
+
+All backends have the same methods (the subset of fluidsynth.Synth the app uses):
+    sfload(path) -> sfid, program_select(channel, sfid, bank, program),
+    noteon(channel, note, velocity), noteoff(channel, note), cc(channel, control, value),
+    system_reset(), get_samples(frames), delete()
+
+- FluidSynthBackend: the real synth (live audio, or offline without an audio driver)
+- NullBackend: does nothing, for benchmarks without an audio stack
+- RecordingBackend: records every call with a perf_counter_ns timestamp, so the real
+  playback path (PlaybackEngine.play_midi) can be checked with exact timing assertions
+"""
+import time
+
+
+class FluidSynthBackend:
+    """fluidsynth.Synth. With `audio=False` no audio driver is started (offline rendering)."""
+    def __init__(self, sample_rate=44100, audio=True):
+        import fluidsynth  # Only needed for this backend
+        self.synth = fluidsynth.Synth(samplerate=float(sample_rate))
+        if audio:
+            self.synth.start()  # Start audio driver (is smart enough to choose depending on os)
+
+    def sfload(self, path):
+        return self.synth.sfload(path)
+
+    def program_select(self, channel, sfid, bank, program):
+        self.synth.program_select(channel, sfid, bank, program)
+
+    def noteon(self, channel, note, velocity):
+        self.synth.noteon(channel, note, velocity)
+
+    def noteoff(self, channel, note):
+        self.synth.noteoff(channel, note)
+
+    def cc(self, channel, control, value):
+        self.synth.cc(channel, control, value)
+
+    def system_reset(self):
+        self.synth.system_reset()
+
+    def get_samples(self, frames):
+        """Interleaved stereo int16 samples (numpy array)."""
+        return self.synth.get_samples(frames)
+
+    def delete(self):
+        self.synth.delete()
+
+
+class NullBackend:
+    """Accepts every call and does nothing."""
+    def __init__(self, sample_rate=44100):
+        self.sample_rate = sample_rate
+        self._next_sfid = 1
+
+    def sfload(self, path):
+        sfid = self._next_sfid
+        self._next_sfid += 1
+        return sfid
+
+    def program_select(self, channel, sfid, bank, program):
+        pass
+
+    def noteon(self, channel, note, velocity):
+        pass
+
+    def noteoff(self, channel, note):
+        pass
+
+    def cc(self, channel, control, value):
+        pass
+
+    def system_reset(self):
+        pass
+
+    def get_samples(self, frames):
+        """Silence, in the same layout as fluidsynth (interleaved stereo int16)."""
+        import numpy as np
+        return np.zeros(frames * 2, dtype=np.int16)
+
+    def delete(self):
+        pass
+
+
+class RecordingBackend(NullBackend):
+    """
+    Records every synth call as (timestamp_ns, method, args...) in `calls`.
+    Timestamps come from time.perf_counter_ns(), the clock of the Scheduler.
+    """
+    def __init__(self, sample_rate=44100):
+        super().__init__(sample_rate)
+        self.calls = []
+
+    def _record(self, *call):
+        self.calls.append((time.perf_counter_ns(),) + call)  # list.append is atomic, safe from any thread
+
+    def program_select(self, channel, sfid, bank, program):
+        self._record("program_select", channel, sfid, bank, program)
+
+    def noteon(self, channel, note, velocity):
+        self._record("noteon", channel, note, velocity)
+
+    def noteoff(self, channel, note):
+        self._record("noteoff", channel, note)
+
+    def cc(self, channel, control, value):
+        self._record("cc", channel, control, value)
+
+    def system_reset(self):
+        self._record("system_reset")
+
+    def clear(self):
+        self.calls.clear()
+
+    def timeline(self, method=None, start_ns=None):
+        """
+        Calls as (seconds since `start_ns` (default: first call), method, args...),
+        optionally only those of one method.
+        """
+        if not self.calls:
+            return []
+        start_ns = self.calls[0][0] if start_ns is None else start_ns
+        timeline = []
+        for stamp, *call in self.calls:
+            if method is None or call[0] == method:
+                timeline.append(((stamp - start_ns) / 1e9, *call))
+        return timeline
+
+
+BACKENDS = {
+    "fluidsynth": FluidSynthBackend,
+    "null": NullBackend,
+    "recording": RecordingBackend,
+}
+
+
+def create_backend(name="fluidsynth", **kwargs):
+    """Backend by name (see BACKENDS)."""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown synth backend: {name} (choose from {', '.join(BACKENDS)})") from None
+    return backend(**kwargs)  # Errors of the backend itself are not an unknown name
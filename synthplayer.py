@@ -3,18 +3,20 @@ import os_check  # Ensures this script also works on Windows
 import os
 import time
 import mido
-import fluidsynth
 from sf2utils.sf2parse import Sf2File
 from PySide6.QtWidgets import QFileDialog
 from PySide6.QtCore import Signal, QObject
+from event_buffer import EventBuffer
+from engine import PlaybackEngine
+from synth_backend import FluidSynthBackend
+from playback_log import logger
 
 
 class SynthPlayer(QObject):
     presets_updated = Signal()
 
-    def __init__(self, soundfont_path, max_rows):
+    def __init__(self, soundfont_path, max_rows, backend=None):
         super().__init__()
-        self.interrupt_flag = False
 
         self.sf_path = soundfont_path
         self.max_rows = max_rows
@@ -22,97 +24,48 @@ class SynthPlayer(QObject):
         self.instrument_banks = [0 for i in range(self.max_rows)]
 
         self.presets = self.extract_presets(soundfont_path)
+        self.preset_index = self.index_presets(self.presets)
         self.presets_updated.emit()
 
-        self.fs = fluidsynth.Synth()
-        self.fs.start()  # Start audio driver (is smart enough to choose depending on os)
+        self.fs = backend if backend is not None else FluidSynthBackend()  # See synth_backend.py
         self.sfid = self.fs.sfload(soundfont_path)  # Charger la soundfont
         for ch in range(self.max_rows):
             self.fs.program_select(ch, self.sfid, 0, 0)
-        self.on_marker = None  # Will be set by UI
+        self.engine = PlaybackEngine(self.fs, self.sfid, self.instrument_banks, self.max_rows)  # Qt-free playback core
+
+    @property
+    def playhead(self):
+        """Position of the playback (see playhead.Playhead), polled by the UI."""
+        return self.engine.dispatcher.playhead
 
     def interrupt(self):
-        self.interrupt_flag = True
+        self.engine.interrupt()
 
     def change_instrument(self, channel, instrument, bank=0):
-        print(f"Change instrument on channel {channel} to {instrument}")
+        logger.info("Change instrument on channel %s to %s", channel, instrument)
         self.fs.program_select(channel, self.sfid, bank, instrument)
         self.instrument_banks[channel] = bank
+        self.engine.dispatcher.reset_state(channel)  # The dispatcher did not send this program
 
     def play_note(self, note, duration=1, velocity=100, channel=0):
         self.fs.noteon(channel, note, velocity)
         time.sleep(duration)
         self.fs.noteoff(channel, note)
 
-    def play_midi(self, tracks):
-        """
-        `tracks` is a list of MIDO tracks, one track per instrument row.
-        Each track is a list of mido.Message objects.
-        `msg.time` is as a delta-time (seconds since the last event)!
-        The track index => channel #.
-        """
-        all_events = []
-        for channel, track in enumerate(tracks):
-            abs_time = 0.0
-            for msg in track:
-                abs_time += msg.time  # Convert delta-time to absolute time
-                all_events.append((abs_time, channel, msg))
-
-        # Sort events by ascending time
-        all_events.sort(key=lambda x: x[0])
-
-        start_wall_time = time.time()
-
-        for (event_time, channel, msg) in all_events:
-            if self.interrupt_flag:
-                self.interrupt_flag = False
-                print("Playback interrupted.")
-                break
-
-            # Wait until it's time for this event
-            now = time.time()
-            wait_time = event_time - (now - start_wall_time)
-            if wait_time > 0:
-                time.sleep(wait_time)
-
-            # Dispatch to fluidsynth
-            if msg.type == 'program_change':
-                print(f"Bank: {self.instrument_banks[channel]}, Program: {msg.program} in channel {channel}")
-                self.fs.program_select(channel, self.sfid, self.instrument_banks[channel], msg.program)
-            elif msg.type == 'control_change':
-                if msg.control == 1:  # Modulation wheel
-                    #mido.Message('control_change', control=vibrato_cc, value=value)
-                    self.fs.cc(channel, 1, msg.value)
-                elif msg.control == 91:  # Reverb
-                    self.fs.cc(channel, 91, msg.value)
-                elif msg.control == 93:  # chorus
-                    self.fs.cc(channel, 93, msg.value)
-            elif msg.type == 'note_on':
-                if msg.note == 0:  # Ignore note 0 (placeholder for silence)
-                    continue
-                
-                velocity = max(0, min(msg.velocity, 127))  # clip velocity
-                self.fs.noteon(channel, msg.note, velocity)
-
-            elif isinstance(msg, mido.MetaMessage) and msg.type == "marker":
-                if self.on_marker:
-                    self.on_marker(msg.text)  # Send block id like '2#0' to make ui flash
-            elif msg.type == 'note_off':
-                self.fs.noteoff(channel, msg.note)
-                self.fs.cc(channel, 1, 0)  # Reset modulation
-                self.fs.cc(channel, 91, 0)  # Reset reverb
-                self.fs.cc(channel, 93, 0)
-            else:
-                print(f"Unknown message type: {msg.type}")
+    def play_midi(self, tracks, loop_length=None):
+        """Play one loop of EventBuffers, see PlaybackEngine.play_midi."""
+        self.engine.play_midi(tracks, loop_length)
 
     def stop_all_sounds(self):
         """
-        Send note-off to all possible notes on all channels.
-        Useful for "panic" or stopping early.
+        Send note-off to the notes that are sounding.
+        Useful for stopping early.
         """
-        for ch in range(self.max_rows):
-            for note in range(128):  # MIDI note range
-                self.fs.noteoff(ch, note)
+        self.engine.stop_all_sounds()
+
+    def panic(self):
+        """Silence all channels with All Sound Off / All Notes Off, see PlaybackEngine.panic."""
+        self.engine.panic()
 
     def close(self):
         """Properly clean up fluidsynth resources"""
@@ -126,8 +79,11 @@ class SynthPlayer(QObject):
                 for ch in range(self.max_rows):
                     self.fs.program_select(ch, new_sfid, 0, 0)
                 self.sfid = new_sfid
+                self.engine.dispatcher.sfid = new_sfid
+                self.engine.dispatcher.reset_state()
                 self.sf_path = path
                 self.presets = self.extract_presets(path)
+                self.preset_index = self.index_presets(self.presets)
                 print(f"Loaded SoundFont: {path}")
                 self.presets_updated.emit()
                 return True
@@ -175,6 +131,14 @@ class SynthPlayer(QObject):
 
             return presets
 
+    @staticmethod
+    def index_presets(presets):
+        """(bank, program) -> index of the first such preset (= index in the instrument combo boxes)."""
+        index = {}
+        for i, preset in enumerate(presets):
+            index.setdefault((preset["bank"], preset["program"]), i)
+        return index
+
 
 
 if __name__ == "__main__":    
@@ -198,5 +162,5 @@ if __name__ == "__main__":
     # path = '/usr/share/sounds/sf2/FluidR3_GM.sf2'
     print(f"using path {path}")
     player = SynthPlayer(path, max_rows=16)
-    player.play_midi(midi_messages)
+    player.play_midi([EventBuffer.from_mido(track, channel) for channel, track in enumerate(midi_messages)])
 
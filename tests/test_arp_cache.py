@@ -0,0 +1,94 @@
+# test_arp_cache.py
+import threading
+
+from arp import ArpParams, Mode
+from arp_cache import ArpeggioCache
+
+
+def make_params(**changes):
+    params = ArpParams(
+        rate=1.0, note_length=0.2, ground_note=60, mute_ground_note=False, mode=Mode.UP,
+        velocity=64, variants_active=(True, False, False), chords_active=(False, False, False),
+        variants=(4, 0, 0), mute=False, vibrato=False, reverb=False, chorus=False,
+    )
+    return params._replace(**changes)
+
+
+def test_size_stays_constant_under_repeated_edits():
+    cache = ArpeggioCache()
+    for ground_note in range(40, 80):
+        cache.get_arpeggio("block", make_params(ground_note=ground_note), 120, 0)
+        assert cache.stats()["entries"] == 1
+    for bpm in range(60, 100):
+        cache.get_arpeggio("block", make_params(), bpm, 0)
+    for instrument in range(20):
+        cache.get_arpeggio("block", make_params(), 120, instrument)
+    assert cache.stats()["entries"] == 1
+
+
+def test_entry_shared_by_owners_is_kept():
+    cache = ArpeggioCache()
+    cache.get_arpeggio("a", make_params(), 120, 0)
+    cache.get_arpeggio("b", make_params(), 120, 0)
+    cache.get_arpeggio("a", make_params(ground_note=62), 120, 0)
+    assert cache.stats()["entries"] == 2  # "b" still uses the first entry
+
+    cache.get_arpeggio("b", make_params(), 120, 0)
+    assert cache.stats()["hits"] == 2  # "b" found the entry of "a" both times
+
+    cache.invalidate("a")
+    cache.invalidate("b")
+    assert cache.stats()["entries"] == 0
+
+
+def test_interning_keeps_the_field_types():
+    params = make_params(rate=1, velocity=64.0, mute=0, variants=(4.0, 0, 0))
+    assert params is make_params()
+    assert type(params.rate) is float and type(params.velocity) is int and params.mute is False
+    assert [type(variant) for variant in params.variants] == [int, int, int]
+
+    flag = make_params(note_length=True, vibrato=1)  # Created first this time
+    assert make_params(note_length=1.0, vibrato=True) is flag
+    assert type(flag.note_length) is float and flag.vibrato is True
+
+
+def test_reloading_a_project_does_not_grow_the_owners():
+    cache = ArpeggioCache()
+    for reload in range(3):
+        uids = [f"block-{reload}-{index}" for index in range(200)]  # New widgets on every load
+        for index, uid in enumerate(uids):
+            cache.get_arpeggio(uid, make_params(ground_note=40 + index % 40), 120, 0)
+        assert cache.stats()["owners"] == 200
+        for uid in uids:  # del_instrument invalidates the blocks of every row
+            cache.invalidate(uid)
+        assert cache.stats()["owners"] == 0
+        assert cache.stats()["entries"] == 0
+        assert not cache._key_owners
+
+
+def test_entries_without_owner_are_bounded():
+    cache = ArpeggioCache(max_entries=8)
+    for ground_note in range(40, 80):
+        cache.get_arpeggio(None, make_params(ground_note=ground_note), 120, 0)
+    assert cache.stats()["entries"] == 8
+
+
+def test_counters_from_several_threads():
+    cache = ArpeggioCache()
+    params = [make_params(ground_note=ground_note) for ground_note in range(48, 56)]
+
+    def compile_blocks():
+        for _ in range(200):
+            for p in params:
+                cache.get_arpeggio(None, p, 120, 0)
+            cache.get_arpeggio(None, make_params(mode=Mode.RANDOM), 120, 0)
+
+    threads = [threading.Thread(target=compile_blocks) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 4 * 200 * len(params)
+    assert stats["bypassed"] == 4 * 200
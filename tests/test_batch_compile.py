@@ -0,0 +1,37 @@
+# test_batch_compile.py
+import pytest
+
+from batch_compile import compile_project_batch
+from project import compile_project
+from project_generator import generate_project
+
+PROJECTS = [
+    dict(rows=1, blocks=1, seed=0),
+    dict(rows=4, blocks=16, bpm=120, seed=1),
+    dict(rows=8, blocks=40, bpm=97, seed=2, rates=(0.5, 1, 2, 4), mute_density=0.2, effect_density=0.5),
+    dict(rows=16, blocks=10, bpm=180, seed=3, rates=(0.25, 1.5, 3), variant_density=0.9),
+    dict(rows=3, blocks=25, bpm=60, seed=4, variant_density=0.0),
+]
+
+
+def columns(track):
+    return list(track.channel), list(track.type), list(track.data1), list(track.data2)
+
+
+@pytest.mark.parametrize("markers", [False, True])
+@pytest.mark.parametrize("options", PROJECTS)
+def test_batch_compile_matches_compile_project(options, markers):
+    project = generate_project(random_mode=0.0, **options)  # Random mode is reshuffled by each compile
+    if len(project.rows) > 1:
+        # A muted row compiles to an empty track but still counts for the loop length
+        project = project._replace(rows=(project.rows[0]._replace(mute=True),) + project.rows[1:])
+
+    tracks, loop_length = compile_project(project, markers=markers)
+    batch_tracks, batch_loop_length = compile_project_batch(project, markers=markers)
+
+    assert batch_loop_length == pytest.approx(loop_length)
+    assert len(batch_tracks) == len(tracks)
+    assert sum(len(track) for track in tracks) > 0
+    for track, batch_track in zip(tracks, batch_tracks):
+        assert columns(batch_track) == columns(track)
+        assert list(batch_track.time) == pytest.approx(list(track.time), abs=1e-9)
@@ -0,0 +1,291 @@
+# test_engine.py
+import threading
+import time
+
+from engine import PlaybackEngine
+from event_buffer import EventBuffer, NOTE_ON, NOTE_OFF
+from synth_backend import RecordingBackend
+
+
+def make_engine():
+    backend = RecordingBackend()
+    return PlaybackEngine(backend, backend.sfload("test.sf2"), [0] * 16), backend
+
+
+def make_track(channel, notes):
+    """EventBuffer (delta times) of (start, end, note) in seconds, in time order."""
+    events = sorted(
+        [(start, NOTE_ON, note, 100) for start, _, note in notes]
+        + [(end, NOTE_OFF, note, 0) for _, end, note in notes],
+        key=lambda event: (event[0], event[1] != NOTE_OFF)  # Note-offs first, like the arpeggiator
+    )
+    track = EventBuffer()
+    last = 0.0
+    for time, type, note, velocity in events:
+        track.append(time - last, type, note, velocity, channel=channel)
+        last = time
+    return track
+
+
+def test_wake_up_after_consumed_edit_is_not_lost():
+    """notify_edit() preempted between setting edit_pending and waking the scheduler."""
+    engine, backend = make_engine()
+    polled = threading.Event()
+
+    def poll_edits(now, loop_length):
+        polled.set()
+        return []
+    engine.poll_edits = poll_edits
+
+    woken = []
+    wait_until = engine.scheduler.wait_until
+
+    def counting_wait_until(event_time, record=True):
+        lateness = wait_until(event_time, record)
+        if lateness is None:
+            woken.append(event_time)
+        return lateness
+    engine.scheduler.wait_until = counting_wait_until
+
+    engine.edit_pending = True  # First half of notify_edit()
+    thread = threading.Thread(target=engine.play_midi, args=([make_track(0, [(0.05, 0.3, 60)])], 0.4))
+    thread.start()
+    assert polled.wait(1.0)  # The playback thread consumed the edit...
+    engine.scheduler.interrupt()  # ...before the second half of notify_edit() woke it up
+    thread.join()
+
+    assert len(woken) <= 1  # Not a busy loop until the end of the loop
+    assert [call[1:] for call in backend.calls] == [("noteon", 0, 60, 100), ("noteoff", 0, 60)]
+
+
+def test_note_on_while_a_channel_is_released_stays_tracked():
+    engine, backend = make_engine()
+    dispatcher = engine.dispatcher
+    for note in (60, 64):
+        dispatcher.dispatch(0, NOTE_ON, note, 100)
+    noteoff = backend.noteoff
+
+    def noteoff_then_play(channel, note):
+        noteoff(channel, note)
+        if note == 60:
+            dispatcher.dispatch(0, NOTE_ON, 67, 100)  # The playback thread, while the GUI thread releases
+    backend.noteoff = noteoff_then_play
+
+    dispatcher.release_channel(0)
+    assert dispatcher.active_notes[0] == {67}
+    dispatcher.release_all()
+    assert ("noteoff", 0, 67) in [call[1:] for call in backend.calls]
+
+
+TOLERANCE = 0.02  # Seconds an event may be late on a loaded CI machine (it is never early)
+
+
+def played(backend, engine, loop_start=0.0):
+    """Recorded notes as (seconds since the start of the loop, method, channel, note)."""
+    start_ns = engine.scheduler.epoch_ns + round(loop_start * 1e9)
+    return [(time, method, channel, note) for time, method, channel, note, *_ in backend.timeline(start_ns=start_ns)]
+
+
+def assert_timing(played, expected):
+    assert [call[1:] for call in played] == [call[1:] for call in expected]
+    for (time, *call), (deadline, *_) in zip(played, expected):
+        assert deadline <= time < deadline + TOLERANCE, (call, time, deadline)
+
+
+def test_play_midi_order_channels_and_timing():
+    engine, backend = make_engine()
+    tracks = [
+        make_track(0, [(0.0, 0.1, 60), (0.1, 0.2, 64)]),
+        make_track(1, [(0.05, 0.15, 48)]),
+    ]
+    engine.start_session()
+    engine.play_midi(tracks, 0.25)
+
+    assert_timing(played(backend, engine), [
+        (0.0, "noteon", 0, 60),
+        (0.05, "noteon", 1, 48),
+        (0.1, "noteoff", 0, 60),
+        (0.1, "noteon", 0, 64),
+        (0.15, "noteoff", 1, 48),
+        (0.2, "noteoff", 0, 64),
+    ])
+    assert engine.scheduler.loop_time() >= 0  # Returned at the end of the loop (0.25 s), not at the last event
+
+
+def test_play_midi_continues_on_the_loop_boundary():
+    engine, backend = make_engine()
+    tracks = [make_track(0, [(0.0, 0.05, 60)]), make_track(1, [(0.1, 0.15, 67)])]
+    engine.start_session()
+    for loop in range(3):
+        engine.play_midi(tracks, 0.2)
+
+    expected = []
+    for loop in range(3):
+        start = loop * 0.2  # Every loop starts exactly where the previous one ended
+        expected += [
+            (start, "noteon", 0, 60),
+            (start + 0.05, "noteoff", 0, 60),
+            (start + 0.1, "noteon", 1, 67),
+            (start + 0.15, "noteoff", 1, 67),
+        ]
+    assert_timing(played(backend, engine), expected)
+
+
+def test_lateness_of_every_event_of_the_last_loop():
+    engine, backend = make_engine()
+    tracks = [make_track(0, [(0.0, 0.05, 60), (0.05, 0.1, 62)]), make_track(1, [(0.0, 0.1, 48)])]
+    engine.start_session()
+    engine.play_midi(tracks, 0.15)
+    engine.play_midi(tracks[:1], 0.15)
+
+    stats = engine.stats.snapshot()
+    assert len(engine.stats.last_loop_lateness_ns) == 4  # The second loop only
+    assert stats["last_loop_events"] == 4
+    assert 0 <= stats["last_loop_lateness_p50_us"] <= stats["last_loop_lateness_max_us"] <= stats["lateness_max_us"]
+    assert stats["last_loop_lateness_max_us"] < TOLERANCE * 1e6
+
+
+def test_event_rate_during_the_first_loop():
+    engine, backend = make_engine()
+    tracks = [make_track(0, [(0.0, 0.05, 60), (0.05, 0.1, 62)])]
+    engine.start_session()
+    thread = threading.Thread(target=engine.play_midi, args=(tracks, 0.3))
+    thread.start()
+    time.sleep(0.15)
+    stats = engine.stats.snapshot()
+    thread.join()
+
+    assert stats["loops"] == 0 and stats["events"] == 4
+    assert 4 / 0.3 < stats["events_per_second"] < 4 / 0.1
+
+
+def test_compile_stats_do_not_grow():
+    stats = PlaybackEngine(None, None, []).stats
+    for seconds in (0.002, 0.004, 0.003) * 1000:
+        stats.record_compile(seconds)
+    snapshot = stats.snapshot()
+    assert snapshot["compile_ms_last"] == 3.0 and snapshot["compile_ms_max"] == 4.0
+    assert abs(snapshot["compile_ms_mean"] - 3.0) < 1e-9
+    assert stats.compiles == 3000 and not hasattr(stats, "compile_times")  # Running totals, no per-loop record
+
+
+def test_notify_edit_splices_the_edited_track_at_its_boundary():
+    engine, backend = make_engine()
+    tracks = [
+        make_track(0, [(0.0, 0.1, 60), (0.2, 0.3, 62)]),
+        make_track(1, [(0.0, 0.35, 48)]),
+    ]
+    edited = make_track(0, [(0.0, 0.1, 70), (0.2, 0.3, 72)])
+    polls = []
+
+    def poll_edits(now, loop_length):
+        polls.append(now)
+        return [(0.2, 0, edited)]  # The edited row takes over at its next block boundary
+    engine.poll_edits = poll_edits
+
+    engine.start_session()
+    edit = threading.Timer(0.05, engine.notify_edit)
+    edit.start()
+    engine.play_midi(tracks, 0.4)
+    edit.join()
+
+    assert len(polls) == 1 and 0.05 <= polls[0] < 0.2
+    assert engine.loop_edited  # The loop compiled ahead of time is stale
+    assert_timing(played(backend, engine), [
+        (0.0, "noteon", 0, 60),
+        (0.0, "noteon", 1, 48),
+        (0.1, "noteoff", 0, 60),
+        (0.2, "noteon", 0, 72),  # Joins the edited track in the middle
+        (0.3, "noteoff", 0, 72),
+        (0.35, "noteoff", 1, 48),  # Other rows are not affected
+    ])
+
+
+def test_edit_of_a_row_missing_from_the_loop_is_dropped():
+    engine, backend = make_engine()
+    tracks = [make_track(0, [(0.0, 0.2, 60)])]
+    engine.poll_edits = lambda now, loop_length: [(0.1, 1, make_track(1, [(0.0, 0.2, 48)]))]
+
+    engine.start_session()
+    edit = threading.Timer(0.05, engine.notify_edit)
+    edit.start()
+    engine.play_midi(tracks, 0.3)  # Row 1 was added after the loop was compiled
+    edit.join()
+
+    assert [call[1:] for call in backend.calls] == [("noteon", 0, 60, 100), ("noteoff", 0, 60)]
+
+
+def test_no_splice_after_the_structure_of_the_loop_changed():
+    from arp import ArpParams, Mode
+    from playback_thread import PlaybackThread
+    from project import Project, ProjectRow
+
+    params = ArpParams(
+        rate=1.0, note_length=0.2, ground_note=60, mute_ground_note=False, mode=Mode.UP,
+        velocity=64, variants_active=(True, False, False), chords_active=(False, False, False),
+        variants=(4, 0, 0), mute=False, vibrato=False, reverb=False, chorus=False,
+    )
+    row = ProjectRow(mute=False, volume=100, instrument=0, bank=0, blocks=(params,))
+    edited_row = row._replace(blocks=(params._replace(ground_note=64),))
+    playing = Project(bpm=120, rows=(row,))
+    snapshots = [playing]
+    thread = PlaybackThread(get_snapshot=lambda: snapshots[-1], synth=None, quantize=1)
+    thread.start_loop(([], 2.0, playing))
+
+    for snapshot in [
+        Project(bpm=120, rows=(row, row)),  # Add an instrument...
+        Project(bpm=120, rows=(row, edited_row)),  # ...then a block to it
+        Project(bpm=120, rows=(edited_row, edited_row)),
+    ]:
+        snapshots.append(snapshot)
+        assert thread.poll_edits(0.1, 2.0) == []
+
+    thread.start_loop(([], 2.0, snapshots[-1]))  # Recompiled at the loop boundary
+    snapshots.append(Project(bpm=90, rows=(edited_row, edited_row)))
+    assert thread.poll_edits(0.1, 2.0) == []
+    snapshots.append(Project(bpm=120, rows=(row, edited_row)))  # Back to the playing BPM
+    assert thread.poll_edits(0.1, 2.0) == []
+
+    thread.start_loop(([], 2.0, snapshots[-1]))
+    snapshots.append(Project(bpm=120, rows=(row, row)))
+    [(swap_time, channel, track)] = thread.poll_edits(0.1, 2.0)
+    assert (swap_time, channel) == (0.5, 1)
+
+
+def test_splice_at_a_block_boundary_keeps_the_start_of_the_block():
+    """Block starts and event times are summed differently and differ by a few ULP at 97 BPM."""
+    from arp import ArpParams, Mode
+    from event_buffer import MARKER
+    from playback_thread import PlaybackThread
+    from project import Project, ProjectRow, compile_project
+
+    def params(rate, ground_note):
+        return ArpParams(
+            rate=rate, note_length=0.5, ground_note=ground_note, mute_ground_note=False, mode=Mode.UP,
+            velocity=64, variants_active=(True, True, False), chords_active=(False, False, False),
+            variants=(4, 7, 0), mute=False, vibrato=False, reverb=False, chorus=False,
+        )
+
+    rates = (3.0, 1.5, 0.75, 2.0, 3.0, 1.0, 1.5, 3.0)
+    row = ProjectRow(mute=False, volume=100, instrument=0, bank=0, blocks=tuple(params(rate, 60) for rate in rates))
+    playing = Project(bpm=97, rows=(row,))
+    tracks, loop_length = compile_project(playing, markers=True)
+    starts = [0.0]
+    for rate in rates:
+        starts.append(starts[-1] + (1 / rate) * (60 / 97))
+
+    for index in range(1, len(rates)):
+        edited = Project(bpm=97, rows=(row._replace(blocks=tuple(params(rate, 72) for rate in rates)),))
+        snapshots = [playing]
+        thread = PlaybackThread(get_snapshot=lambda: snapshots[-1], synth=None)
+        thread.start_loop((tracks, loop_length, playing))
+        snapshots.append(edited)
+        [(swap_time, channel, track)] = thread.poll_edits(starts[index - 1] + 0.01, loop_length)
+
+        merger = PlaybackEngine.prepare_midi(tracks)
+        while merger.peek_time() < swap_time:
+            next(merger)
+        merger.replace(channel, track, swap_time, until=loop_length)
+        _, _, type, _, block = next(event for event in merger if event[2] != NOTE_OFF)  # The previous block's ends
+        assert (type, block) == (MARKER, index)
+        assert any(event[2] == NOTE_ON and event[3] == 72 for event in [next(merger) for _ in range(3)])
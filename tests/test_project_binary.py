@@ -0,0 +1,68 @@
+# test_project_binary.py
+import pytest
+
+from project import Project, ProjectRow, read_project, write_project
+from project_binary import BinaryProject
+from project_generator import generate_project
+
+
+@pytest.fixture
+def project():
+    return generate_project(rows=6, blocks=30, bpm=97, seed=5, rates=(0.5, 1, 2), random_mode=0.2, mute_density=0.1)
+
+
+def test_json_to_binary_round_trip(tmp_path, project):
+    write_project(str(tmp_path / "project.json"), project)
+    from_json = read_project(str(tmp_path / "project.json"))
+    write_project(str(tmp_path / "project.loop"), from_json)
+
+    assert read_project(str(tmp_path / "project.loop")) == from_json == project
+
+
+def test_single_row_reads(tmp_path, project):
+    for name in ("project.json", "project.loop"):
+        path = str(tmp_path / name)
+        write_project(path, project)
+        assert read_project(path, rows=[3]) == Project(bpm=project.bpm, rows=(project.rows[3],))
+        assert read_project(path, rows=[5, 0]).rows == (project.rows[5], project.rows[0])
+        for rows in ([-1], [6]):  # Both formats refuse the same indices
+            with pytest.raises(IndexError):
+                read_project(path, rows=rows)
+
+    with BinaryProject(str(tmp_path / "project.loop")) as binary:
+        assert len(binary) == 6
+        assert binary.read_row(2) == project.rows[2]
+
+
+def test_empty_project_and_rows(tmp_path):
+    empty_row = ProjectRow(mute=True, volume=0, instrument=5, bank=128, blocks=())
+    for project in (Project(bpm=120, rows=()), Project(bpm=92.5, rows=(empty_row,))):
+        write_project(str(tmp_path / "project.loop"), project)
+        assert read_project(str(tmp_path / "project.loop")) == project
+
+
+def test_truncated_file(tmp_path, project):
+    path = tmp_path / "project.loop"
+    write_project(str(path), project)
+    data = path.read_bytes()
+    for size in (0, 10, 200, len(data) - 1):
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            BinaryProject(str(path))
+
+
+def test_blocks_are_decoded_on_first_use(tmp_path, project):
+    import pickle
+
+    path = str(tmp_path / "project.loop")
+    write_project(path, project)
+    with BinaryProject(path) as binary:
+        row = binary.read_row(1)
+    assert row.blocks._blocks is None and len(row.blocks) == len(project.rows[1].blocks)
+
+    assert row == project.rows[1] and project.rows[1] == row  # Outlives the closed file
+    assert hash(row) == hash(project.rows[1])
+    assert all(a is b for a, b in zip(row.blocks, project.rows[1].blocks))  # Interned
+    assert row.blocks[:2] + (row.blocks[2],) == project.rows[1].blocks[:3]
+    assert pickle.loads(pickle.dumps(row)).blocks == project.rows[1].blocks
+    assert type(pickle.loads(pickle.dumps(row)).blocks) is tuple
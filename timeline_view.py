@@ -0,0 +1,364 @@
+# timeline_view.py
+"""
+Timeline view for large projects: all blocks of all rows on one custom-painted canvas.
+
+    python timeline_view.py saves/stress.json
+
+Unlike the main window, blocks are not widgets. Only the blocks inside the visible part of the
+canvas are painted (found by bisecting the block start times of each row), so scrolling stays
+smooth with 10,000+ blocks. Clicking a block opens the full ArpeggiatorWidget editor for that
+block alone; its edits replace the block in the project (see project.Project).
+"""
+import os_check  # Ensures this script also works on Windows
+import sys
+import argparse
+from bisect import bisect_right
+from itertools import accumulate
+
+from PySide6.QtWidgets import (
+    QApplication,
+    QMainWindow,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QPushButton,
+    QLabel,
+    QScrollArea,
+    QAbstractScrollArea,
+    QSplitter,
+    QFileDialog,
+    QStyle
+)
+from PySide6.QtCore import Qt, Signal, QTimer, QRectF
+from PySide6.QtGui import QPainter, QColor, QPen
+
+from arp import Mode
+from arp_widget import ArpeggiatorWidget
+from project import Project, read_project, write_project
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+MODE_COLORS = {
+    None: QColor("#5B7FA6"),
+    Mode.UP: QColor("#4C9A6A"),
+    Mode.DOWN: QColor("#A6784C"),
+    Mode.RANDOM: QColor("#8A5BA6"),
+}
+MUTED_COLOR = QColor("#555555")
+PLAYHEAD_COLOR = QColor("#E50046")
+SELECTED_COLOR = QColor("#FFFFFF")
+
+
+class TimelineCanvas(QAbstractScrollArea):
+    """
+    Paints the blocks of a project, one row per instrument, x = time in beats.
+    Block widths are proportional to their play time (1 / rate).
+    """
+    block_selected = Signal(int, int)  # (row, block index)
+
+    row_height = 48
+    header_width = 40  # Row numbers on the left
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.project = Project(bpm=60, rows=())
+        self.starts = []  # Per row: start of every block in beats, plus the end of the row
+        self.beat_width = 120.0  # Pixels per beat (Ctrl + mouse wheel to zoom)
+        self.selected = None  # (row, block index)
+        self.playhead = []  # Block index playing in every row (see playhead.Playhead)
+
+        self.viewport().setAutoFillBackground(False)
+        self.horizontalScrollBar().setSingleStep(20)
+        self.verticalScrollBar().setSingleStep(self.row_height // 2)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+
+    def set_project(self, project):
+        self.project = project
+        self.starts = [self._row_starts(row) for row in project.rows]
+        if self.selected and not self._valid(*self.selected):
+            self.selected = None
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def update_row(self, row_idx, project):
+        """`project` differs from the current one in row `row_idx` only."""
+        previous = self.project.rows[row_idx]
+        self.project = project
+        row = project.rows[row_idx]
+        if [p.rate for p in row.blocks] != [p.rate for p in previous.blocks]:
+            self.starts[row_idx] = self._row_starts(row)
+            self._update_scrollbars()
+        self.viewport().update()
+
+    def set_playhead(self, positions):
+        """Repaint only when a row moved to another block."""
+        if positions != self.playhead:
+            self.playhead = positions
+            self.viewport().update()
+
+    def _row_starts(self, row):
+        return list(accumulate((1 / params.rate for params in row.blocks), initial=0.0))
+
+    def _valid(self, row_idx, block_idx):
+        return row_idx < len(self.project.rows) and block_idx < len(self.project.rows[row_idx].blocks)
+
+    def _update_scrollbars(self):
+        total_beats = max((starts[-1] for starts in self.starts), default=0)
+        content_width = self.header_width + int(total_beats * self.beat_width)
+        content_height = len(self.starts) * self.row_height
+        viewport = self.viewport().size()
+        self.horizontalScrollBar().setRange(0, max(0, content_width - viewport.width()))
+        self.horizontalScrollBar().setPageStep(viewport.width())
+        self.verticalScrollBar().setRange(0, max(0, content_height - viewport.height()))
+        self.verticalScrollBar().setPageStep(viewport.height())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            # Zoom around the mouse position
+            x = event.position().x() - self.header_width
+            beat = (self.horizontalScrollBar().value() + x) / self.beat_width
+            factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+            self.beat_width = max(4.0, min(2000.0, self.beat_width * factor))
+            self._update_scrollbars()
+            self.horizontalScrollBar().setValue(int(beat * self.beat_width - x))
+            self.viewport().update()
+            return
+        super().wheelEvent(event)
+
+    def block_at(self, x, y):
+        """(row, block index) under the viewport position (x, y), or None."""
+        row_idx = (y + self.verticalScrollBar().value()) // self.row_height
+        if x < self.header_width or not 0 <= row_idx < len(self.starts):
+            return None
+        beat = (x - self.header_width + self.horizontalScrollBar().value()) / self.beat_width
+        starts = self.starts[row_idx]
+        block_idx = bisect_right(starts, beat) - 1
+        if 0 <= block_idx < len(starts) - 1:
+            return row_idx, block_idx
+        return None
+
+    def mousePressEvent(self, event):
+        hit = self.block_at(int(event.position().x()), int(event.position().y()))
+        if hit is not None:
+            self.selected = hit
+            self.viewport().update()
+            self.block_selected.emit(*hit)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor("#2B2B2B"))
+        width = self.viewport().width()
+        height = self.viewport().height()
+        scroll_x = self.horizontalScrollBar().value()
+        scroll_y = self.verticalScrollBar().value()
+
+        # Visible range in beats and rows: only blocks that overlap it are painted
+        first_beat = scroll_x / self.beat_width
+        last_beat = (scroll_x + width - self.header_width) / self.beat_width
+        first_row = scroll_y // self.row_height
+        last_row = min(len(self.starts), (scroll_y + height) // self.row_height + 1)
+
+        for row_idx in range(first_row, last_row):
+            row = self.project.rows[row_idx]
+            starts = self.starts[row_idx]
+            top = row_idx * self.row_height - scroll_y
+            block_idx = max(0, bisect_right(starts, first_beat) - 1)
+            while block_idx < len(row.blocks) and starts[block_idx] < last_beat:
+                params = row.blocks[block_idx]
+                x = self.header_width + starts[block_idx] * self.beat_width - scroll_x
+                rect = QRectF(x, top + 2, (starts[block_idx + 1] - starts[block_idx]) * self.beat_width, self.row_height - 4)
+                self._paint_block(painter, rect, params, row.mute, row_idx, block_idx)
+                block_idx += 1
+
+        # Row numbers on top of the blocks that scrolled under them
+        painter.fillRect(0, 0, self.header_width, height, QColor("#202020"))
+        painter.setPen(QColor("#CCCCCC"))
+        for row_idx in range(first_row, last_row):
+            top = row_idx * self.row_height - scroll_y
+            painter.drawText(QRectF(0, top, self.header_width, self.row_height), Qt.AlignCenter, str(row_idx + 1))
+        painter.end()
+
+    def _paint_block(self, painter, rect, params, row_muted, row_idx, block_idx):
+        color = MUTED_COLOR if params.mute or row_muted else MODE_COLORS[params.mode]
+        painter.fillRect(rect.adjusted(1, 0, -1, 0), color)
+
+        if self.selected == (row_idx, block_idx):
+            painter.setPen(QPen(SELECTED_COLOR, 2))
+            painter.drawRect(rect.adjusted(2, 1, -2, -1))
+        elif row_idx < len(self.playhead) and self.playhead[row_idx] == block_idx:
+            painter.setPen(QPen(PLAYHEAD_COLOR, 3))
+            painter.drawRect(rect.adjusted(2, 1, -2, -1))
+
+        if rect.width() > 30:  # Labels only where they fit
+            painter.setPen(QColor("#F0F0F0"))
+            note = params.ground_note
+            label = f"{NOTE_NAMES[note % 12]}{note // 12 - 1}"
+            if rect.width() > 70:
+                label += f"  x{params.rate:g}"
+            painter.drawText(rect.adjusted(4, 0, -2, 0), Qt.AlignVCenter | Qt.AlignLeft, label)
+
+
+class TimelineWindow(QMainWindow):
+    """
+    A TimelineCanvas with a single ArpeggiatorWidget below it, editing the selected block.
+    Can play the project while it is being edited (same PlaybackThread as the main window).
+    """
+    def __init__(self, project, soundfont_path, filename=None):
+        super().__init__()
+        self.project = project  # Immutable, read by the playback thread
+        self.soundfont_path = soundfont_path
+        self.filename = filename
+        self.synth = None  # Created on first play (loads the soundfont)
+        self.playback_thread = None
+        self.editor = None
+        self.editing = None  # (row, block index) of the editor
+
+        self.setWindowTitle(f"Timeline - {filename}" if filename else "Timeline")
+        self.resize(1200, 700)
+
+        # Toolbar
+        self.play_button = QPushButton()
+        self.play_button.setCheckable(True)
+        self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+        self.play_button.toggled.connect(self.on_play_toggled)
+        self.save_button = QPushButton("Save")
+        self.save_button.clicked.connect(self.save)
+        self.info_label = QLabel()
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(self.play_button)
+        toolbar.addWidget(self.save_button)
+        toolbar.addWidget(self.info_label, stretch=1)
+
+        self.canvas = TimelineCanvas()
+        self.canvas.block_selected.connect(self.edit_block)
+
+        self.editor_area = QScrollArea()
+        self.editor_area.setWidgetResizable(True)
+        self.editor_area.setWidget(QLabel("Click a block to edit it."))
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.canvas)
+        splitter.addWidget(self.editor_area)
+        splitter.setSizes([400, 300])
+
+        main_widget = QWidget()
+        layout = QVBoxLayout(main_widget)
+        layout.setContentsMargins(5, 5, 5, 5)
+        layout.addLayout(toolbar)
+        layout.addWidget(splitter)
+        self.setCentralWidget(main_widget)
+
+        self.playhead_timer = QTimer(self)
+        self.playhead_timer.setInterval(16)  # ~60 Hz
+        self.playhead_timer.timeout.connect(self.update_playhead)
+
+        self.canvas.set_project(project)
+        self._update_info()
+
+    def _update_info(self):
+        blocks = sum(len(row.blocks) for row in self.project.rows)
+        self.info_label.setText(f"{len(self.project.rows)} rows, {blocks} blocks, {self.project.bpm} BPM (Ctrl + wheel to zoom)")
+
+    def edit_block(self, row_idx, block_idx):
+        """Replace the editor with one for the selected block."""
+        params = self.project.rows[row_idx].blocks[block_idx]
+        editor = ArpeggiatorWidget(
+            velocity=params.velocity,
+            rate=params.rate,
+            note_length=params.note_length,
+            ground_note=params.ground_note,
+            mute_ground_note=params.mute_ground_note,
+            mode=params.mode,
+            mute=params.mute,
+            vibrato=params.vibrato,
+            reverb=params.reverb,
+            chorus=params.chorus,
+            variants_active=list(params.variants_active),
+            variants=list(params.variants),
+            chords_active=list(params.chords_active),
+        )
+        editor.set_variants(editor.arp.variants_active, editor.arp.variants)
+        editor.update_chord_button_states()
+        editor.params_changed.connect(self._on_editor_changed)
+
+        if self.editor is not None:
+            self.editor.params_changed.disconnect(self._on_editor_changed)
+        self.editor = editor
+        self.editing = (row_idx, block_idx)
+        self.editor_area.setWidget(editor)  # Deletes the previous editor
+
+    def _on_editor_changed(self):
+        row_idx, block_idx = self.editing
+        row = self.project.rows[row_idx]
+        blocks = row.blocks[:block_idx] + (self.editor.arp.params(),) + row.blocks[block_idx + 1:]
+        rows = self.project.rows[:row_idx] + (row._replace(blocks=blocks),) + self.project.rows[row_idx + 1:]
+        self.project = self.project._replace(rows=rows)
+        self.canvas.update_row(row_idx, self.project)
+        if self.playback_thread:
+            self.playback_thread.notify_edit()
+
+    def on_play_toggled(self, checked):
+        if checked:
+            self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaStop))
+            self.start_playback()
+        else:
+            self.play_button.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+            self.stop_playback()
+
+    def start_playback(self):
+        from synthplayer import SynthPlayer
+        from playback_thread import PlaybackThread
+
+        if self.synth is None:
+            self.synth = SynthPlayer(self.soundfont_path, max_rows=16)
+        for channel, row in enumerate(self.project.rows):
+            self.synth.change_instrument(channel, row.instrument, bank=row.bank)
+        self.playback_thread = PlaybackThread(get_snapshot=lambda: self.project, synth=self.synth)
+        self.playback_thread.start()
+        self.playhead_timer.start()
+
+    def stop_playback(self):
+        if self.playback_thread:
+            self.playback_thread.stop()
+            self.playback_thread.wait()
+            self.playback_thread = None
+        self.playhead_timer.stop()
+        self.canvas.set_playhead([])
+
+    def update_playhead(self):
+        self.canvas.set_playhead(self.synth.playhead.read())
+
+    def save(self):
+        filename = self.filename
+        if not filename:
+            filename, _ = QFileDialog.getSaveFileName(self, "Save Project", "saves", "Projects (*.json *.loop)")
+            if not filename:
+                return
+        write_project(filename, self.project)
+        self.filename = filename
+        print(f"Project saved to {filename}")
+
+    def closeEvent(self, event):
+        self.stop_playback()
+        super().closeEvent(event)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show and edit a project on a timeline (for large projects).")
+    parser.add_argument("project", help="Project file (.json or .loop) to open.")
+    parser.add_argument("-sf", "--soundfont", help="Path to the SoundFont file to use.", default=os_check.default_soundfont())
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    window = TimelineWindow(read_project(args.project), args.soundfont, filename=args.project)
+    window.show()
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
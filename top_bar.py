@@ -1,13 +1,17 @@
 # top_bar.py
 import os
-from PySide6.QtWidgets import QWidget, QHBoxLayout, QPushButton, QSpinBox, QStyle, QLabel, QFileDialog, QMainWindow
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QPushButton, QSpinBox, QStyle, QLabel, QComboBox, QFileDialog, QMainWindow
 from PySide6.QtCore import Qt, QSize, Signal
 from PySide6.QtGui import QShortcut, QKeySequence
-from save_load import save_project, load_project
+from save_load import save_project, load_project, export_midi
 
 
 class TopBarWidget(QWidget):
     bpm_changed = Signal(int)
+    quantize_changed = Signal(int)
+
+    # Grid for edits made while playing: (label, beats), None = next block start
+    quantize_options = [("Block", None), ("Bar", 4), ("Beat", 1), ("1/2 Beat", 0.5)]
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -42,6 +46,18 @@ class TopBarWidget(QWidget):
         self.loop_length_label = QLabel("Loop Length: 0.60s")
         self.loop_length_label.setToolTip("The loop length is determined by the longest arpeggio chain")
 
+        # --- Playback statistics ---
+        self.stats_label = QLabel("No events yet")
+        self.stats_label.setToolTip("Dispatch lateness (99th percentile and max), events per second, longest backlog of late events and loop compile time")
+
+        # --- Live edit quantization ---
+        self.quantize_label = QLabel("Quantize:")
+        self.quantize_combo = QComboBox()
+        for label, beats in self.quantize_options:
+            self.quantize_combo.addItem(label, beats)
+        self.quantize_combo.setToolTip("When edits made during playback are heard")
+        self.quantize_combo.currentIndexChanged.connect(self.quantize_changed.emit)
+
         # --- Load SoundFont button ---
         self.font_button = QPushButton("🎵")
         self.font_button.setToolTip("Change SoundFont (SF2)")
@@ -60,6 +76,11 @@ class TopBarWidget(QWidget):
         self.load_button.setToolTip("Load")
         self.load_button.clicked.connect(self.on_load_clicked)
 
+        # --- Export MIDI button ---
+        self.export_button = QPushButton("MIDI")
+        self.export_button.setToolTip("Export the loop as a MIDI file")
+        self.export_button.clicked.connect(self.on_export_clicked)
+
         # Add them to layout
         layout.addWidget(self.play_button)
         layout.addSpacing(16)
@@ -69,11 +90,19 @@ class TopBarWidget(QWidget):
         layout.addSpacing(16)
 
         layout.addWidget(self.loop_length_label)
+        layout.addSpacing(16)
+
+        layout.addWidget(self.stats_label)
+        layout.addSpacing(16)
+
+        layout.addWidget(self.quantize_label)
+        layout.addWidget(self.quantize_combo)
         layout.addStretch(1)
 
         layout.addWidget(self.font_button)
         layout.addWidget(self.save_button)
         layout.addWidget(self.load_button)
+        layout.addWidget(self.export_button)
 
     @property
     def bpm(self):
@@ -86,6 +115,11 @@ class TopBarWidget(QWidget):
         self.rate_spin.setValue(value)
         self.bpm_changed.emit(value)
     
+    @property
+    def quantize(self):
+        """Quantization grid in beats, None for block boundaries."""
+        return self.quantize_combo.currentData()
+
     def _on_bpm_changed(self, value: int):
         self.bpm_changed.emit(value)
     
@@ -93,6 +127,10 @@ class TopBarWidget(QWidget):
         """Set the loop length label text to the given value."""
         self.loop_length_label.setText(f"Loop Length: {length_s:.2f}s")
 
+    def set_stats(self, text: str):
+        """Show the playback statistics summary (see PlaybackStats.summary)."""
+        self.stats_label.setText(text)
+
     def on_play_toggled(self, checked: bool):
         """Switch between the play and stop icon depending on toggle state."""
         if checked:
@@ -144,3 +182,13 @@ class TopBarWidget(QWidget):
             mw = self.main_window()
             if mw:
                 load_project(mw, filename=filename)
+
+    def on_export_clicked(self):
+        save_dir = os.path.join(os.path.dirname(__file__), "saves")
+        os.makedirs(save_dir, exist_ok=True)
+
+        filename, _ = QFileDialog.getSaveFileName(self, "Export MIDI", save_dir, "MIDI Files (*.mid)")
+        if filename:
+            mw = self.main_window()
+            if mw:
+                export_midi(mw, filename=filename)
@@ -0,0 +1,72 @@
+# track_merge.py
+import heapq
+from event_buffer import TIME_EPSILON
+
+
+class TrackMerger:
+    """
+    Lazy k-way merge of delta-time tracks (EventBuffers, one per row) into one time-ordered stream.
+
+    Iterating yields (abs_time, channel, type, data1, data2). Each track is already in time order,
+    so the heap only ever holds the next pending event of every track: memory and startup cost
+    scale with the number of tracks, not with the number of events.
+    Events with the same time come out in track order, then in the order within the track.
+
+    A track can be swapped while the merge is running (see replace), which is how live edits
+    are spliced into the loop that is playing.
+    """
+    def __init__(self, tracks):
+        self._tracks = list(tracks)
+        self._cursors = [0] * len(tracks)  # Index of the next event of each track
+        self._until = [float("inf")] * len(tracks)  # Events at or after this time are dropped (replaced tracks)
+        self._heap = [(track.time[0], index) for index, track in enumerate(tracks) if len(track)]
+        heapq.heapify(self._heap)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        heap = self._heap
+        if not heap:
+            raise StopIteration
+
+        abs_time, index = heap[0]
+        track = self._tracks[index]
+        i = self._cursors[index]
+        event = (abs_time, track.channel[i], track.type[i], track.data1[i], track.data2[i])
+
+        i += 1
+        if i < len(track.type) and abs_time + track.time[i] < self._until[index]:
+            self._cursors[index] = i
+            heapq.heapreplace(heap, (abs_time + track.time[i], index))
+        else:
+            heapq.heappop(heap)
+        return event
+
+    def peek_time(self):
+        """Time of the next event, or None when the merge is exhausted."""
+        return self._heap[0][0] if self._heap else None
+
+    def replace(self, index, track, from_time, until=float("inf")):
+        """
+        Swap track `index` for `track` (a whole loop, delta times) from `from_time` on.
+        Events of the new track before `from_time` and at or after `until` are skipped (events a few
+        ULP before `from_time` count as at `from_time`, see TIME_EPSILON).
+        Returns False, and changes nothing, if there is no track `index`.
+        """
+        if not 0 <= index < len(self._tracks):
+            return False
+        self._heap = [entry for entry in self._heap if entry[1] != index]
+        self._tracks[index] = track
+        self._until[index] = until
+
+        abs_time = 0.0
+        for i, delta in enumerate(track.time):
+            abs_time += delta
+            if abs_time >= from_time - TIME_EPSILON:
+                if abs_time < until:
+                    self._cursors[index] = i
+                    self._heap.append((abs_time, index))
+                break
+        heapq.heapify(self._heap)
+        return True